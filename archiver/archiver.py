@@ -1,15 +1,31 @@
-from dataclasses import dataclass
-from typing import Callable, List, Optional, Tuple, Type
+import abc
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple, Type, Union, overload
 import os
+import sqlite3
+from array import array
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import time
 import zipfile
 import subprocess  # noqa
 import copy
+import gzip
+import math
+import mmap
+import struct
+import sys
+import re
+from functools import lru_cache, partial
 import argparse
+from contextlib import contextmanager
 from .version import __version__
 from alive_progress import alive_bar  # type: ignore
 import boto3  # type: ignore
 import json
+import io
 from pkgutil import get_data
 
 
@@ -32,18 +48,60 @@ def format_bytes(n_bytes: int) -> str:
         return f"{n_bytes / 1024 ** 4:,.2f} TB"
 
 
+# Hours and days of last modified times which are cached when formatting them
+TIMESTAMP_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def _utc_offset(hour: int) -> Optional[Tuple[int, str]]:
+    """
+    The local offset from UTC, in seconds and as formatted by %z, during an hour since the epoch. None if the offset
+    changes within the hour, or isn't a whole number of minutes.
+    """
+    start = time.localtime(hour * 3600)
+    end = time.localtime(hour * 3600 + 3599)
+    if start.tm_gmtoff != end.tm_gmtoff or start.tm_gmtoff % 60 != 0:
+        return None
+    return start.tm_gmtoff, time.strftime("%z", start)
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def _format_day(day: int) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(day * 86400))
+
+
+# The time part of an ISO last modified time, by minute of the day and second
+_MINUTES_OF_DAY = [f"T{minute // 60:02d}:{minute % 60:02d}:" for minute in range(24 * 60)]
+_SECONDS = [f"{second:02d}" for second in range(60)]
+
+
 def format_last_modified_time(last_modified: float) -> str:
     """
     Format a last modified time.
+
+    The same as time.strftime("%Y-%m-%d", time.localtime(last_modified)), but the offset from UTC is looked up once
+    per hour and the date formatted once per day, as calling localtime and strftime for every file is slow.
     """
-    return time.strftime("%Y-%m-%d", time.localtime(last_modified))
+    seconds = math.floor(last_modified)
+    offset = _utc_offset(seconds // 3600)
+    if offset is None:
+        return time.strftime("%Y-%m-%d", time.localtime(last_modified))
+    return _format_day((seconds + offset[0]) // 86400)
 
 
 def format_last_modified_time_as_iso(last_modified: float) -> str:
     """
     Format a last modified time.
+
+    The same as time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(last_modified)), see format_last_modified_time.
     """
-    return time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(last_modified))
+    seconds = math.floor(last_modified)
+    offset = _utc_offset(seconds // 3600)
+    if offset is None:
+        return time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(last_modified))
+    day, second_of_day = divmod(seconds + offset[0], 86400)
+    minute_of_day, second = divmod(second_of_day, 60)
+    return _format_day(day) + _MINUTES_OF_DAY[minute_of_day] + _SECONDS[second] + offset[1]
 
 
 @dataclass
@@ -53,6 +111,9 @@ class FileMetadata:
     size: int
     last_modified: float
     present_in_chunks: Optional[List[int]] = None
+    # Archive path of the file's directory, shared by all of its files and set once the scan is complete (see
+    # set_archive_directories). The archive path of the file is this followed by its name.
+    archive_directory: Optional[str] = field(default=None, compare=False, repr=False)
 
 
 @dataclass
@@ -65,7 +126,7 @@ class DirectoryMetadata:
 
 @dataclass
 class DirectoryTree:
-    files: List[FileMetadata]
+    files: Sequence[FileMetadata]
     total_size_bytes: int
     directories: List["DirectoryTree"]
     path: str
@@ -74,6 +135,491 @@ class DirectoryTree:
     present_in_chunks: Optional[List[int]] = None
 
 
+class FileSequence(Sequence[FileMetadata], abc.ABC):
+    """
+    The files of one directory, when they are not held as a list of FileMetadata (see FileTableSlice and
+    StoredFiles). Behaves as a read-only list. As the FileMetadata returned may be copies, chunk numbers are recorded
+    with set_chunk_no.
+    """
+    # Total size of the files
+    size_bytes: int
+
+    @abc.abstractmethod
+    def _read(self, start: int, stop: int) -> Iterator[FileMetadata]:
+        ...
+
+    @abc.abstractmethod
+    def set_chunk_no(self, chunk_no: int, start: int = 0, stop: Optional[int] = None) -> None:
+        """
+        Assign files start to stop (by default, every file) to a chunk.
+        """
+
+    @abc.abstractmethod
+    def set_archive_directory(self, archive_directory: str) -> None:
+        """
+        Record the archive path of the directory holding the files.
+        """
+
+    def __iter__(self) -> Iterator[FileMetadata]:
+        return self._read(0, len(self))
+
+    @overload
+    def __getitem__(self, index: int) -> FileMetadata:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[FileMetadata]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[FileMetadata, List[FileMetadata]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step < 0:
+                return list(self._read(0, len(self)))[index]
+            return list(self._read(start, stop))[::step]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"{type(self).__name__} index out of range")
+        return next(self._read(index, index + 1))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> List[FileMetadata]:
+        # A deep copy is an in-memory list of the files
+        return [
+            FileMetadata(
+                path=f.path,
+                absolute_path=f.absolute_path,
+                size=f.size,
+                last_modified=f.last_modified,
+                present_in_chunks=copy.copy(f.present_in_chunks),
+                archive_directory=f.archive_directory
+            )
+            for f in self
+        ]
+
+
+class FileTable:
+    """
+    Compact, columnar storage for the metadata of many files.
+
+    Rather than one FileMetadata per file, sizes, modification times and chunk numbers are held in typed arrays, file
+    names as UTF-8 in one buffer, and each file's directory as an index into a table of directory paths. This takes
+    around 40 bytes per file plus the length of its name. The files of each directory are a contiguous range of rows,
+    handed out as a FileTableSlice, and each row is read and written through a FileView.
+    """
+    def __init__(self) -> None:
+        self._directories: List[str] = []
+        self._directory_ids: Dict[str, int] = {}
+        self._archive_directories: List[Optional[str]] = []
+        self._names = bytearray()
+        self._name_offsets = array("Q", [0])
+        self._directory_id = array("I")
+        self._sizes = array("q")
+        self._last_modified = array("d")
+        # -1 for no chunk. Files in more than one chunk keep their chunk numbers in _multi_chunks instead.
+        self._chunks = array("i")
+        self._multi_chunks: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the table's columns, excluding the directory table.
+        """
+        columns = (self._name_offsets, self._directory_id, self._sizes, self._last_modified, self._chunks)
+        return len(self._names) + sum(c.itemsize * len(c) for c in columns)
+
+    def _intern_directory(self, directory: str) -> int:
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            directory_id = len(self._directories)
+            self._directories.append(directory)
+            self._directory_ids[directory] = directory_id
+            self._archive_directories.append(None)
+        return directory_id
+
+    def add_files(self, directory: str, files: Sequence[FileMetadata]) -> "FileTableSlice":
+        """
+        Add the files of a directory to the table, returning the slice of the table which holds them.
+        """
+        directory_id = self._intern_directory(directory)
+        start = len(self)
+        for f in files:
+            self._names += f.path.encode("utf-8", "surrogateescape")
+            self._name_offsets.append(len(self._names))
+            self._directory_id.append(directory_id)
+            self._sizes.append(f.size)
+            self._last_modified.append(f.last_modified)
+            self._chunks.append(-1)
+            if f.present_in_chunks:
+                self.set_chunks(len(self) - 1, f.present_in_chunks)
+
+        return FileTableSlice(self, start, len(self), sum(f.size for f in files))
+
+    def merge(self, other: "FileTable", directory_tree: DirectoryTree) -> None:
+        """
+        Append the rows of another table to this one, and point the FileTableSlices of directory_tree which refer to
+        the other table at the appended rows.
+        """
+        offset = len(self)
+        directory_ids = [self._intern_directory(d) for d in other._directories]
+        for directory_id, archive_directory in zip(directory_ids, other._archive_directories):
+            if archive_directory is not None:
+                self._archive_directories[directory_id] = archive_directory
+        names_offset = len(self._names)
+
+        self._names += other._names
+        self._name_offsets.extend(o + names_offset for o in other._name_offsets[1:])
+        self._directory_id.extend(directory_ids[i] for i in other._directory_id)
+        self._sizes.extend(other._sizes)
+        self._last_modified.extend(other._last_modified)
+        self._chunks.extend(other._chunks)
+        for index, chunks in other._multi_chunks.items():
+            self._multi_chunks[index + offset] = chunks
+
+        stack = [directory_tree]
+        while stack:
+            tree = stack.pop()
+            if isinstance(tree.files, FileTableSlice) and tree.files.table is other:
+                tree.files.table = self
+                tree.files.start += offset
+                tree.files.stop += offset
+            stack.extend(tree.directories)
+
+    def name(self, index: int) -> str:
+        return self._names[self._name_offsets[index]:self._name_offsets[index + 1]].decode("utf-8", "surrogateescape")
+
+    def directory(self, index: int) -> str:
+        return self._directories[self._directory_id[index]]
+
+    def archive_directory(self, index: int) -> Optional[str]:
+        return self._archive_directories[self._directory_id[index]]
+
+    def set_archive_directory(self, index: int, archive_directory: str) -> None:
+        """
+        Set the archive directory of all files in the same directory as the file at index.
+        """
+        self._archive_directories[self._directory_id[index]] = archive_directory
+
+    def size(self, index: int) -> int:
+        return self._sizes[index]
+
+    def set_size(self, index: int, size: int) -> None:
+        self._sizes[index] = size
+
+    def last_modified(self, index: int) -> float:
+        return self._last_modified[index]
+
+    def set_last_modified(self, index: int, last_modified: float) -> None:
+        self._last_modified[index] = last_modified
+
+    def chunks(self, index: int) -> Optional[List[int]]:
+        if index in self._multi_chunks:
+            return list(self._multi_chunks[index])
+        chunk = self._chunks[index]
+        return [chunk] if chunk >= 0 else None
+
+    def set_chunks(self, index: int, chunks: Optional[List[int]]) -> None:
+        self._multi_chunks.pop(index, None)
+        self._chunks[index] = -1
+        if chunks is not None and len(chunks) == 1:
+            self._chunks[index] = chunks[0]
+        elif chunks:
+            self._multi_chunks[index] = list(chunks)
+
+    def set_chunk_range(self, start: int, stop: int, chunk_no: int) -> None:
+        for index in range(start, stop):
+            self._multi_chunks.pop(index, None)
+        self._chunks[start:stop] = array("i", [chunk_no]) * (stop - start)
+
+
+class FileView(FileMetadata):
+    """
+    A FileMetadata backed by one row of a FileTable. Reading or setting an attribute reads or writes the table.
+    """
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: FileTable, index: int):
+        self._table = table
+        self._index = index
+
+    # The name and directory of a file in the table are read-only
+    @property
+    def path(self) -> str:  # type: ignore[override]
+        return self._table.name(self._index)
+
+    @property
+    def absolute_path(self) -> str:  # type: ignore[override]
+        return os.path.join(self._table.directory(self._index), self._table.name(self._index))
+
+    @property
+    def archive_directory(self) -> Optional[str]:  # type: ignore[override]
+        return self._table.archive_directory(self._index)
+
+    @property
+    def size(self) -> int:
+        return self._table.size(self._index)
+
+    @size.setter
+    def size(self, size: int) -> None:
+        self._table.set_size(self._index, size)
+
+    @property
+    def last_modified(self) -> float:
+        return self._table.last_modified(self._index)
+
+    @last_modified.setter
+    def last_modified(self, last_modified: float) -> None:
+        self._table.set_last_modified(self._index, last_modified)
+
+    @property
+    def present_in_chunks(self) -> Optional[List[int]]:
+        return self._table.chunks(self._index)
+
+    @present_in_chunks.setter
+    def present_in_chunks(self, present_in_chunks: Optional[List[int]]) -> None:
+        self._table.set_chunks(self._index, present_in_chunks)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FileMetadata):
+            return NotImplemented
+        return (self.path, self.absolute_path, self.size, self.last_modified, self.present_in_chunks) == (
+            other.path, other.absolute_path, other.size, other.last_modified, other.present_in_chunks
+        )
+
+
+class FileTableSlice(FileSequence):
+    """
+    The files of one directory, held in rows start to stop of a FileTable.
+    """
+    def __init__(self, table: FileTable, start: int, stop: int, size_bytes: int):
+        self.table = table
+        self.start = start
+        self.stop = stop
+        self.size_bytes = size_bytes
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def _read(self, start: int, stop: int) -> Iterator[FileMetadata]:
+        for index in range(self.start + start, self.start + stop):
+            yield FileView(self.table, index)
+
+    def set_chunk_no(self, chunk_no: int, start: int = 0, stop: Optional[int] = None) -> None:
+        if stop is None:
+            stop = len(self)
+        self.table.set_chunk_range(self.start + start, self.start + stop, chunk_no)
+
+    def set_archive_directory(self, archive_directory: str) -> None:
+        if self.stop > self.start:
+            self.table.set_archive_directory(self.start, archive_directory)
+
+
+class ScanStore:
+    """
+    On-disk store for the metadata of scanned files, backed by SQLite.
+
+    When scanning with a store, the files of each directory are written to the store as soon as the directory has been
+    listed, and the directory tree only holds a StoredFiles handle for them. Everything which walks the tree (chunker,
+    listings, JSON) then reads the files back one directory at a time, so memory use depends on the number of
+    directories rather than the number of files.
+    """
+    def __init__(self, path: str):
+        if os.path.exists(path):
+            raise RuntimeError(f"Scan store {path} already exists.")
+
+        self._path = path
+        self._connection = sqlite3.connect(path)
+        self._next_directory_id = 0
+
+        # The store is scratch space for a single run, so durability is not needed
+        self._connection.execute("PRAGMA journal_mode = OFF")
+        self._connection.execute("PRAGMA synchronous = OFF")
+        self._connection.execute(
+            "CREATE TABLE directories ("
+            " id INTEGER PRIMARY KEY, path TEXT, file_count INTEGER, files_size_bytes INTEGER, total_size_bytes INTEGER"
+            ")"
+        )
+        # Files are clustered by directory, in the order they were listed, so each directory is read with a range scan
+        self._connection.execute(
+            "CREATE TABLE files ("
+            " directory_id INTEGER, position INTEGER, name TEXT, size INTEGER, last_modified REAL, chunk INTEGER,"
+            " PRIMARY KEY (directory_id, position)"
+            ") WITHOUT ROWID"
+        )
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def add_files(self, directory: str, files: Sequence[FileMetadata]) -> "StoredFiles":
+        """
+        Write the files of a directory to the store, returning a handle to read them back.
+        """
+        directory_id = self._next_directory_id
+        self._next_directory_id += 1
+
+        files_size_bytes = sum(f.size for f in files)
+        self._connection.execute(
+            "INSERT INTO directories VALUES (?, ?, ?, ?, NULL)", (directory_id, directory, len(files), files_size_bytes)
+        )
+        self._connection.executemany(
+            "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    directory_id, position, f.path, f.size, f.last_modified,
+                    f.present_in_chunks[0] if f.present_in_chunks else None
+                )
+                for position, f in enumerate(files)
+            )
+        )
+        return StoredFiles(self, directory_id, directory, len(files), files_size_bytes)
+
+    def set_total_sizes(self, directory_tree: DirectoryTree) -> None:
+        """
+        Record the total size (including sub directories) of every stored directory in the tree.
+        """
+        rows = []
+        stack = [directory_tree]
+        while stack:
+            tree = stack.pop()
+            if isinstance(tree.files, StoredFiles) and tree.files.store is self:
+                rows.append((tree.total_size_bytes, tree.files.directory_id))
+            stack.extend(tree.directories)
+        self._connection.executemany("UPDATE directories SET total_size_bytes = ? WHERE id = ?", rows)
+        self._connection.commit()
+
+    def _iter_rows(
+        self, directory_id: int, start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[Tuple[str, int, float, Optional[int]]]:
+        if stop is None:
+            stop = 2 ** 62
+        return self._connection.execute(
+            "SELECT name, size, last_modified, chunk FROM files"
+            " WHERE directory_id = ? AND position >= ? AND position < ? ORDER BY position",
+            (directory_id, start, stop)
+        )
+
+    def _set_chunk(self, directory_id: int, chunk_no: int, start: int = 0, stop: Optional[int] = None) -> None:
+        if stop is None:
+            stop = 2 ** 62
+        self._connection.execute(
+            "UPDATE files SET chunk = ? WHERE directory_id = ? AND position >= ? AND position < ?",
+            (chunk_no, directory_id, start, stop)
+        )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class StoredFiles(FileSequence):
+    """
+    The files of one directory, held in a ScanStore. The FileMetadata are created each time the files are read.
+    """
+    def __init__(self, store: ScanStore, directory_id: int, directory: str, count: int, size_bytes: int):
+        self.store = store
+        self.directory_id = directory_id
+        self.size_bytes = size_bytes
+        self.archive_directory: Optional[str] = None
+        self._directory = directory
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _read(self, start: int, stop: int) -> Iterator[FileMetadata]:
+        for name, size, last_modified, chunk in self.store._iter_rows(self.directory_id, start, stop):
+            yield FileMetadata(
+                path=name,
+                absolute_path=os.path.join(self._directory, name),
+                size=size,
+                last_modified=last_modified,
+                present_in_chunks=[chunk] if chunk is not None else None,
+                archive_directory=self.archive_directory
+            )
+
+    def set_chunk_no(self, chunk_no: int, start: int = 0, stop: Optional[int] = None) -> None:
+        self.store._set_chunk(self.directory_id, chunk_no, start, stop)
+
+    def set_archive_directory(self, archive_directory: str) -> None:
+        self.archive_directory = archive_directory
+
+
+class FileRuns(FileSequence):
+    """
+    Files taken from other sequences as runs of consecutive files, such as the files of a chunk, which can come from
+    several directories. Only the runs are held, so files from a FileSequence are read back from it when needed rather
+    than kept in memory.
+    """
+    def __init__(self, runs: Optional[List[Tuple[Sequence[FileMetadata], int, int]]] = None):
+        self._runs: List[Tuple[Sequence[FileMetadata], int, int]] = []
+        self._count = 0
+        self.size_bytes = 0
+        for files, start, stop in runs or []:
+            for index in range(start, stop):
+                self.append(files, index)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def runs(self) -> List[Tuple[Sequence[FileMetadata], int, int]]:
+        return list(self._runs)
+
+    def append(self, files: Sequence[FileMetadata], index: int, size: Optional[int] = None) -> None:
+        """
+        Add files[index], extending the last run if it follows on from it. Give size to avoid reading the file.
+        """
+        self.size_bytes += files[index].size if size is None else size
+        self._count += 1
+        if self._runs:
+            last_files, start, stop = self._runs[-1]
+            if last_files is files and stop == index:
+                self._runs[-1] = (files, start, stop + 1)
+                return
+        self._runs.append((files, index, index + 1))
+
+    def _iter_runs(self, start: int, stop: int) -> Iterator[Tuple[Sequence[FileMetadata], int, int]]:
+        # The part of each run within files start to stop
+        offset = 0
+        for files, run_start, run_stop in self._runs:
+            first = max(start - offset, 0)
+            last = min(stop - offset, run_stop - run_start)
+            if first < last:
+                yield files, run_start + first, run_start + last
+            offset += run_stop - run_start
+            if offset >= stop:
+                break
+
+    def _read(self, start: int, stop: int) -> Iterator[FileMetadata]:
+        for files, run_start, run_stop in self._iter_runs(start, stop):
+            if isinstance(files, FileSequence):
+                yield from files._read(run_start, run_stop)
+            else:
+                for index in range(run_start, run_stop):
+                    yield files[index]
+
+    def set_chunk_no(self, chunk_no: int, start: int = 0, stop: Optional[int] = None) -> None:
+        if stop is None:
+            stop = len(self)
+        for files, run_start, run_stop in self._iter_runs(start, stop):
+            if isinstance(files, FileSequence):
+                files.set_chunk_no(chunk_no, run_start, run_stop)
+            else:
+                for index in range(run_start, run_stop):
+                    files[index].present_in_chunks = [chunk_no]
+
+    def set_archive_directory(self, archive_directory: str) -> None:
+        raise RuntimeError("The files of a FileRuns can come from several directories, so have no archive directory.")
+
+
 @dataclass
 class ChunkerSettings:
     target_size_bytes = 1024 * 1024 * 1024
@@ -101,36 +647,500 @@ class ChunkerSettings:
         return int(self.target_size_bytes * self.min_chunk_size_factor)
 
 
+def _glob_to_regex(pattern: str) -> str:
+    """
+    A regular expression for a gitignore-style glob pattern. "*" and "?" match within one path component, "[...]"
+    matches one character (other than "/") of a set, "**/" at the start or "/**/" match any number of directories, and
+    a trailing "/**" matches everything below a directory.
+    """
+    parts = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        at_component_start = i == 0 or pattern[i - 1] == "/"
+        if at_component_start and pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif at_component_start and pattern.startswith("**", i) and i + 2 == n:
+            parts.append(".*")
+            i += 2
+        elif c == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif c == "?":
+            parts.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                # No closing bracket, so a literal "["
+                parts.append(re.escape(c))
+                i += 1
+                continue
+            characters = pattern[i + 1:j].replace("\\", "\\\\")
+            if characters[0] in "!^":
+                parts.append("[^/" + characters[1:] + "]")
+            else:
+                parts.append("(?!/)[" + characters + "]")
+            i = j + 1
+        else:
+            parts.append(re.escape(c))
+            i += 1
+    return "(?s:" + "".join(parts) + r")\Z"
+
+
+class ScanFilter:
+    """
+    Decides which files and directories are skipped while scanning, using gitignore-like glob patterns.
+
+    Each rule is a pattern, and whether matching entries are excluded or included. The last rule which matches an entry
+    decides, and entries which match no rule are included. A pattern without a "/" is matched against the name of each
+    entry, and one containing a "/" against its path relative to the root, where "*" doesn't match "/" but "**" does
+    (see _glob_to_regex). A pattern ending in "/" only matches directories. Excluded directories are not descended into,
+    so nothing below them is listed or stat'ed.
+    """
+    IGNORE_FILE = ".archiverignore"
+
+    def __init__(self, root: str, rules: Sequence[Tuple[str, bool]] = ()):
+        self.root = root
+        self.rules = list(rules)
+        # (regex, directories only, match on relative path, exclude)
+        self._compiled: List[Tuple[re.Pattern, bool, bool, bool]] = []
+        for pattern, exclude in self.rules:
+            directories_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            relative = "/" in pattern
+            self._compiled.append(
+                (re.compile(_glob_to_regex(pattern.lstrip("/"))), directories_only, relative, exclude)
+            )
+        self._match_relative = any(relative for _, _, relative, _ in self._compiled)
+
+    @classmethod
+    def from_arguments(cls, root: str, excludes: Sequence[str] = (), includes: Sequence[str] = ()) -> "ScanFilter":
+        """
+        Rules from the .archiverignore file at the root (if any), followed by the given exclude and include patterns.
+
+        Lines of the ignore file are patterns to exclude, or to include when starting with "!". Blank lines and lines
+        starting with "#" are skipped.
+        """
+        rules: List[Tuple[str, bool]] = []
+        ignore_file = os.path.join(root, cls.IGNORE_FILE)
+        if os.path.isfile(ignore_file):
+            with open(ignore_file) as f:
+                for line in f:
+                    line = line.strip()
+                    if len(line) == 0 or line.startswith("#"):
+                        continue
+                    if line.startswith("!"):
+                        rules.append((line[1:], False))
+                    else:
+                        rules.append((line, True))
+
+        rules += [(pattern, True) for pattern in excludes]
+        rules += [(pattern, False) for pattern in includes]
+        return cls(root, rules)
+
+    def relative_directory(self, path: str) -> str:
+        """
+        The path of a directory relative to the root, as used by is_excluded.
+        """
+        if not self._match_relative:
+            # Not needed by any rule, so save working it out for every directory
+            return ""
+        relative = os.path.relpath(path, self.root)
+        return "" if relative == "." else relative.replace(os.sep, "/") + "/"
+
+    def is_excluded(self, relative_directory: str, name: str, is_directory: bool) -> bool:
+        excluded = False
+        for regex, directories_only, relative, exclude in self._compiled:
+            if directories_only and not is_directory:
+                continue
+            if regex.match(relative_directory + name if relative else name):
+                excluded = exclude
+        return excluded
+
+
+class HardLinkIndex:
+    """
+    Files with more than one hard link found while scanning, grouped by (st_dev, st_ino).
+
+    Once the scan is complete, resolve picks one path of each group to be archived (the first in sort order, so the
+    choice doesn't depend on the order directories were scanned in). The other paths are links, which are listed as
+    references to it rather than archived again.
+    """
+    def __init__(self) -> None:
+        self._inodes: Dict[Tuple[int, int], List[Tuple[str, int]]] = {}
+        # Path of each link, to the path of the file archived in its place
+        self.links: Dict[str, str] = {}
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+    def add(self, device: int, inode: int, path: str, size: int) -> None:
+        with self._lock:
+            self._inodes.setdefault((device, inode), []).append((path, size))
+
+    def inodes(self) -> List[Tuple[Tuple[int, int], List[Tuple[str, int]]]]:
+        return list(self._inodes.items())
+
+    def merge(self, other: "HardLinkIndex") -> None:
+        with self._lock:
+            for inode, paths in other._inodes.items():
+                self._inodes.setdefault(inode, []).extend(paths)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Indexes are sent to and from worker processes, which have their own lock
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def resolve(self, directory_tree: DirectoryTree) -> None:
+        """
+        Decide which paths are links, and take their sizes off the total sizes of the directories holding them, so
+        that the tree's sizes are those of the data which will be archived.
+        """
+        self.links = {}
+        self.bytes_saved = 0
+        saved_by_directory: Dict[str, int] = {}
+        for paths in self._inodes.values():
+            if len(paths) < 2:
+                # The other links are outside of the scanned tree
+                continue
+            primary, _ = min(paths)
+            for path, size in paths:
+                if path != primary:
+                    self.links[path] = primary
+                    self.bytes_saved += size
+                    directory = os.path.normpath(os.path.dirname(path))
+                    saved_by_directory[directory] = saved_by_directory.get(directory, 0) + size
+
+        if len(saved_by_directory) == 0:
+            return
+
+        # Sub trees before their parents, so each directory's saving includes those of its sub directories
+        directories: List[DirectoryTree] = []
+        stack = [directory_tree]
+        while stack:
+            tree = stack.pop()
+            directories.append(tree)
+            stack.extend(tree.directories)
+
+        saved: Dict[int, int] = {}
+        for tree in reversed(directories):
+            saved[id(tree)] = saved_by_directory.get(os.path.normpath(tree.path), 0) + sum(
+                saved[id(d)] for d in tree.directories
+            )
+            tree.total_size_bytes -= saved[id(tree)]
+
+
+class ScanCache:
+    """
+    The scans of directories from a previous run, saved as JSON and keyed by absolute path.
+
+    A directory's modification time changes when entries are added to, removed from or renamed in it, so while it is
+    unchanged the cached files and sub directory names are reused instead of listing and stat'ing the directory again.
+    Each sub directory is still stat'ed to check its own modification time. Files which are rewritten in place don't
+    change the modification time of their directory, so their new size is not picked up from a cached scan.
+
+    Cached scans are only reused with the same scan filter rules, and hard link detection setting, as they were made
+    with. Hard links made or removed elsewhere don't change the modification time of the directory either.
+    """
+    VERSION = 2
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        # Scans read from the cache file, and scans made (or reused) during this run, as
+        # [last_modified, [[name, size, last_modified(, device, inode)], ...], [sub directory name, ...]], where the
+        # device and inode are only kept for files with more than one hard link
+        self._previous: Dict[str, list] = {}
+        self._entries: Dict[str, list] = {}
+        # Scan filter rules and hard link detection of the cached scans, and of the scans made during this run
+        self._previous_options: dict = {}
+        self._options: dict = {}
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                cached = json.load(f)
+            # Caches written by another version are ignored, and replaced when saving
+            if cached.get("version") == self.VERSION:
+                self._previous = cached["directories"]
+                self._previous_options = cached["options"]
+
+    def previous_totals(self) -> Tuple[int, int]:
+        """
+        Number of files and their total size in the cached scans, e.g. to estimate how long a scan will take.
+        """
+        n_files = 0
+        size_bytes = 0
+        for entry in self._previous.values():
+            n_files += len(entry[1])
+            size_bytes += sum(row[1] for row in entry[1])
+        return n_files, size_bytes
+
+    def scan_directory(
+        self, path: str, scan_filter: Optional[ScanFilter] = None, hard_links: Optional[HardLinkIndex] = None
+    ) -> Tuple[List[FileMetadata], List[DirectoryMetadata]]:
+        """
+        Same as scan_directory, reusing the cached scan of path if it is still up to date.
+        """
+        key = os.path.abspath(path)
+        last_modified = os.stat(path).st_mtime
+        options = {
+            "rules": [[pattern, exclude] for pattern, exclude in scan_filter.rules] if scan_filter is not None else [],
+            "hard_links": hard_links is not None
+        }
+        entry = self._previous.get(key) if options == self._previous_options else None
+
+        if entry is not None and entry[0] == last_modified:
+            files = []
+            for name, size, modified, *inode in entry[1]:
+                file_path = os.path.join(path, name)
+                files.append(FileMetadata(path=name, absolute_path=file_path, size=size, last_modified=modified))
+                if hard_links is not None and len(inode) > 0:
+                    hard_links.add(inode[0], inode[1], file_path, size)
+            directories = []
+            for name in entry[2]:
+                directory_path = os.path.join(path, name)
+                directories.append(
+                    DirectoryMetadata(
+                        path=name, absolute_path=directory_path, last_modified=os.stat(directory_path).st_mtime
+                    )
+                )
+            hit = True
+        else:
+            # The hard links in this directory are collected separately, so their inodes can be cached
+            directory_hard_links = HardLinkIndex() if hard_links is not None else None
+            files, directories = scan_directory(path, scan_filter, directory_hard_links)
+            rows = [[f.path, f.size, f.last_modified] for f in files]
+            if directory_hard_links is not None and hard_links is not None:
+                inodes = {p: inode for inode, paths in directory_hard_links.inodes() for p, _ in paths}
+                for row, f in zip(rows, files):
+                    if f.absolute_path in inodes:
+                        row.extend(inodes[f.absolute_path])
+                hard_links.merge(directory_hard_links)
+            entry = [last_modified, rows, [d.path for d in directories]]
+            hit = False
+
+        with self._lock:
+            self._entries[key] = entry
+            self._options = options
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return files, directories
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Sub caches are sent to and from worker processes, which have their own lock
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def sub_cache(self, path: str) -> "ScanCache":
+        """
+        A cache holding only the scans of path and the directories below it, e.g. to hand to another process.
+        """
+        prefix = os.path.join(os.path.abspath(path), "")
+        cache = ScanCache()
+        cache._previous = {
+            key: entry for key, entry in self._previous.items() if key == prefix[:-1] or key.startswith(prefix)
+        }
+        cache._previous_options = self._previous_options
+        return cache
+
+    def merge(self, other: "ScanCache") -> None:
+        """
+        Add the scans made with another cache, and its hit and miss counts, to this one.
+        """
+        with self._lock:
+            self._entries.update(other._entries)
+            self._options = other._options
+            self.hits += other.hits
+            self.misses += other.misses
+
+    def save(self) -> None:
+        """
+        Write the scans made during this run to the cache file. Directories which weren't scanned are dropped.
+        """
+        assert self.path is not None
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({"version": self.VERSION, "options": self._options, "directories": self._entries}, f)
+        os.replace(temporary_path, self.path)
+
+
+@dataclass
+class ScannerSettings:
+    workers: int = 1
+    processes: int = 1
+    store: Optional[ScanStore] = None
+    file_table: Optional[FileTable] = None
+    cache: Optional[ScanCache] = None
+    scan_filter: Optional[ScanFilter] = None
+    hard_links: Optional[HardLinkIndex] = None
+
+    def get_file_sink(self) -> Optional[Union[ScanStore, FileTable]]:
+        """
+        Where the files of each scanned directory are kept, if not in lists of FileMetadata.
+        """
+        if self.store is not None and self.file_table is not None:
+            raise ValueError("A scan store and a file table cannot be used together.")
+        return self.store if self.store is not None else self.file_table
+
+    def get_scan_function(self) -> Callable[[str], Tuple[List[FileMetadata], List[DirectoryMetadata]]]:
+        """
+        The function which lists a single directory.
+        """
+        if self.cache is not None:
+            return partial(self.cache.scan_directory, scan_filter=self.scan_filter, hard_links=self.hard_links)
+        if self.scan_filter is not None or self.hard_links is not None:
+            return partial(scan_directory, scan_filter=self.scan_filter, hard_links=self.hard_links)
+        return scan_directory
+
+
+@dataclass
+class ProgressCounters:
+    files: int
+    directories: int
+    size_bytes: int
+    elapsed_seconds: float
+    files_per_second: float
+    bytes_per_second: float
+    # Only known once the expected totals have been set, e.g. from a scan cache
+    eta_seconds: Optional[float] = None
+
+
 class ProgressPrinter:
+    """
+    Reports the progress of a scan. The counters are updated on every call, but the progress bar and verbose output
+    are only rendered once per tick, so that reporting stays cheap when there are millions of directories.
+    """
+    TICK_SECONDS = 0.2
+    PRINT_SECONDS = 30
+
     def __init__(self, verbose: bool = False):
+        self._verbose = verbose
+        self._alive_bar: Optional[Callable] = None
+        # Progress may be reported from several scan threads at once
+        self._lock = threading.Lock()
+        self.start()
+
+    def start(self, expected_files: Optional[int] = None, expected_size_bytes: Optional[int] = None) -> None:
+        """
+        Reset the counters and rates. With the expected totals, an ETA is worked out as well.
+        """
         self._total_added_files = 0
         self._total_added_directories = 0
         self._total_added_size = 0
-        self._verbose = verbose
-        self._alive_bar: Optional[Callable] = None
-        self._last_update_time = 0
+        self._expected_files = expected_files
+        self._expected_size_bytes = expected_size_bytes
+        self._start_time = time.monotonic()
+        self._next_tick_time = 0.0
+        self._last_print_time = -float("inf")
+        # Files added since the progress bar was last moved on
+        self._unrendered_files = 0
 
     def set_alive_bar(self, bar: Callable) -> None:  # noqa
         self._alive_bar = bar
+        self._unrendered_files = 0
 
     def on_directory_tree_progress(
-        self, added_files: List[FileMetadata], added_directories: List[DirectoryMetadata]
+        self, added_files: Sequence[FileMetadata], added_directories: Sequence[DirectoryMetadata]
     ) -> None:
+        if isinstance(added_files, FileSequence):
+            size_bytes = added_files.size_bytes
+        else:
+            size_bytes = sum(f.size for f in added_files)
+        self.on_scan_progress(len(added_files), len(added_directories), size_bytes)
 
-        self._total_added_files += len(added_files)
-        self._total_added_directories += len(added_directories)
-        self._total_added_size += sum(f.size for f in added_files)
-        if self._alive_bar is not None:
-            self._alive_bar(len(added_files))
-        time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        msg = (
-            f"{time_str} Added {self._total_added_files:,} files, {self._total_added_directories:,} directories,"
-            f" {format_bytes(self._total_added_size)}"
+    def on_scan_progress(self, n_files: int, n_directories: int, size_bytes: int) -> None:
+        """
+        Record scanned files and directories by their counts, e.g. for a whole sub tree scanned by another process.
+        """
+        with self._lock:
+            self._total_added_files += n_files
+            self._total_added_directories += n_directories
+            self._total_added_size += size_bytes
+            self._unrendered_files += n_files
+
+            now = time.monotonic()
+            if now >= self._next_tick_time:
+                self._next_tick_time = now + self.TICK_SECONDS
+                self._render(now)
+
+    def flush(self) -> None:
+        """
+        Render the progress now, e.g. at the end of a scan so that the progress bar shows every file.
+        """
+        with self._lock:
+            self._render(time.monotonic())
+
+    def get_counters(self) -> ProgressCounters:
+        with self._lock:
+            return self._get_counters(time.monotonic())
+
+    def _get_counters(self, now: float) -> ProgressCounters:
+        elapsed_seconds = now - self._start_time
+        files_per_second = self._total_added_files / elapsed_seconds if elapsed_seconds > 0 else 0.0
+        bytes_per_second = self._total_added_size / elapsed_seconds if elapsed_seconds > 0 else 0.0
+
+        eta_seconds = None
+        if self._expected_size_bytes is not None and bytes_per_second > 0:
+            eta_seconds = max(self._expected_size_bytes - self._total_added_size, 0) / bytes_per_second
+        elif self._expected_files is not None and files_per_second > 0:
+            eta_seconds = max(self._expected_files - self._total_added_files, 0) / files_per_second
+
+        return ProgressCounters(
+            files=self._total_added_files,
+            directories=self._total_added_directories,
+            size_bytes=self._total_added_size,
+            elapsed_seconds=elapsed_seconds,
+            files_per_second=files_per_second,
+            bytes_per_second=bytes_per_second,
+            eta_seconds=eta_seconds
         )
 
-        if self._verbose and int(time.time()) - self._last_update_time > 30:
-            print(msg)
-            self._last_update_time = int(time.time())
+    def _render(self, now: float) -> None:
+        if self._alive_bar is None and not self._verbose:
+            return
+
+        counters = self._get_counters(now)
+        rates = f"{counters.files_per_second:,.0f} files/s, {format_bytes(int(counters.bytes_per_second))}/s"
+        if counters.eta_seconds is not None:
+            minutes, seconds = divmod(int(counters.eta_seconds), 60)
+            hours, minutes = divmod(minutes, 60)
+            rates += f", ETA {hours}:{minutes:02d}:{seconds:02d}"
+
+        if self._alive_bar is not None:
+            self._alive_bar(self._unrendered_files)
+            self._alive_bar.text = rates  # type: ignore[attr-defined]
+            self._unrendered_files = 0
+
+        if self._verbose and now - self._last_print_time > self.PRINT_SECONDS:
+            time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+            print(
+                f"{time_str} Added {counters.files:,} files, {counters.directories:,} directories,"
+                f" {format_bytes(counters.size_bytes)} ({rates})"
+            )
+            self._last_print_time = now
 
 
 def list_all_files(path: str) -> List[FileMetadata]:
@@ -168,50 +1178,373 @@ def list_all_directories(path: str) -> List[DirectoryMetadata]:
     ]
 
 
-def build_directory_tree(path: str, progress_callback: Optional[ProgressPrinter] = None) -> DirectoryTree:
+def scan_directory(
+    path: str, scan_filter: Optional[ScanFilter] = None, hard_links: Optional[HardLinkIndex] = None
+) -> Tuple[List[FileMetadata], List[DirectoryMetadata]]:
+    """
+    List all files and directories in a directory (non-recursive) in a single pass.
+
+    Uses os.scandir so that each directory is read once, and the file type comes from the cached d_type rather than a
+    separate isfile / isdir call. Each entry is then stat'ed once. Files are sorted by size, smallest to largest.
+
+    Entries excluded by scan_filter are skipped before they are stat'ed. Files with more than one hard link are added
+    to hard_links.
+    """
+    files: List[FileMetadata] = []
+    directories: List[DirectoryMetadata] = []
+    relative_directory = scan_filter.relative_directory(path) if scan_filter is not None else ""
+
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file():
+                if scan_filter is not None and scan_filter.is_excluded(relative_directory, entry.name, False):
+                    continue
+                stat = entry.stat()
+                files.append(
+                    FileMetadata(
+                        path=entry.name,
+                        absolute_path=entry.path,
+                        size=stat.st_size,
+                        last_modified=stat.st_mtime
+                    )
+                )
+                if hard_links is not None and stat.st_nlink > 1:
+                    hard_links.add(stat.st_dev, stat.st_ino, entry.path, stat.st_size)
+            elif entry.is_dir():
+                if scan_filter is not None and scan_filter.is_excluded(relative_directory, entry.name, True):
+                    continue
+                directories.append(
+                    DirectoryMetadata(path=entry.name, absolute_path=entry.path, last_modified=entry.stat().st_mtime)
+                )
+
+    # Sort files by size, smallest to largest
+    files.sort(key=lambda f: f.size)
+
+    return files, directories
+
+
+DirectoryScan = Tuple[Sequence[FileMetadata], List[DirectoryMetadata]]
+
+
+def build_directory_tree(
+    path: str,
+    progress_callback: Optional[ProgressPrinter] = None,
+    scanner_settings: Optional[ScannerSettings] = None
+) -> DirectoryTree:
     """
     Build a directory tree from a path.
+
+    With more than one worker in the scanner settings, directories are listed by a pool of threads. With more than one
+    process, each top level sub directory is scanned in a separate process (each using the configured number of
+    threads) and the sub trees are merged. In all cases, the result is the same as a single threaded scan.
+
+    With a store or file table in the scanner settings, the files of each directory are added to it as soon as the
+    directory is scanned, and the tree holds StoredFiles / FileTableSlice in place of lists.
+
+    With a cache in the scanner settings, directories which haven't changed since the cached scan are not listed again.
+
+    With a hard link index in the scanner settings, hard links are resolved once the scan is complete, and the total
+    sizes of directories don't include the files which are links to others.
+
+    The archive paths of the files are worked out once the scan is complete, taking path as the input directory.
     """
-    files = list_all_files(path)
-    directories = list_all_directories(path)
+    if scanner_settings is None:
+        scanner_settings = ScannerSettings()
+
+    file_sink = scanner_settings.get_file_sink()
+    last_modified = os.stat(os.path.abspath(path)).st_mtime
+
+    if scanner_settings.processes > 1:
+        tree = _build_directory_tree_processes(path, last_modified, scanner_settings, progress_callback)
+    elif scanner_settings.workers > 1:
+        scans = scan_directories_parallel(
+            path, scanner_settings.workers, progress_callback, file_sink, scanner_settings.get_scan_function()
+        )
+        tree = _build_directory_tree(path, last_modified, scans.pop)
+    else:
+        scan_function = scanner_settings.get_scan_function()
+
+        def _scan(directory: str) -> DirectoryScan:
+            files, directories = scan_function(directory)
+            if progress_callback:
+                progress_callback.on_directory_tree_progress(files, directories)
+            if file_sink is not None:
+                return file_sink.add_files(directory, files), directories
+            return files, directories
+
+        tree = _build_directory_tree(path, last_modified, _scan)
 
+    if progress_callback:
+        progress_callback.flush()
+
+    if scanner_settings.hard_links is not None:
+        scanner_settings.hard_links.resolve(tree)
+
+    if scanner_settings.store is not None:
+        scanner_settings.store.set_total_sizes(tree)
+
+    set_archive_directories(tree, path)
+
+    return tree
+
+
+def _build_directory_tree(path: str, last_modified: float, scan: Callable[[str], DirectoryScan]) -> DirectoryTree:
+    def _visit(path: str, last_modified: float) -> Tuple[DirectoryTree, Iterator[DirectoryMetadata]]:
+        files, directories = scan(path)
+        tree = DirectoryTree(
+            files=files,
+            # Size of the files in this directory, sub directories are added once their trees are complete
+            total_size_bytes=files.size_bytes if isinstance(files, FileSequence) else sum(f.size for f in files),
+            directories=[],
+            path=path,
+            absolute_path=os.path.abspath(path),
+            last_modified=last_modified
+        )
+        return tree, iter(directories)
+
+    # Depth first walk with an explicit stack, so that deep trees don't hit the recursion limit. Each stack entry is a
+    # directory together with the sub directories which haven't been visited yet.
+    root, root_directories = _visit(path, last_modified)
+    stack = [(root, root_directories)]
+
+    while stack:
+        tree, directories = stack[-1]
+        d = next(directories, None)
+        if d is not None:
+            # The modification time of each sub directory comes from the scan of its parent, so it is not stat'ed again
+            stack.append(_visit(d.absolute_path, d.last_modified))
+            continue
+
+        # All sub trees of this directory are complete
+        stack.pop()
+
+        # Sort sub_trees by total_size_bytes, smallest to largest
+        tree.directories.sort(key=lambda t: t.total_size_bytes)
+        tree.total_size_bytes += sum(t.total_size_bytes for t in tree.directories)
+
+        if stack:
+            stack[-1][0].directories.append(tree)
+
+    return root
+
+
+def _build_sub_tree(
+    path: str,
+    last_modified: float,
+    workers: int,
+    compact: bool,
+    cache: Optional[ScanCache],
+    scan_filter: Optional[ScanFilter],
+    hard_links: Optional[HardLinkIndex]
+) -> Tuple[DirectoryTree, Any, Optional[ScanCache], Optional[HardLinkIndex]]:
+    """
+    Scan a sub tree in a worker process. Returns the tree, the FileTable holding its files if compact, and the cache
+    and hard link index with the scans made.
+    """
+    settings = ScannerSettings(
+        workers=workers,
+        file_table=FileTable() if compact else None,
+        cache=cache,
+        scan_filter=scan_filter,
+        hard_links=hard_links
+    )
+    scan_function = settings.get_scan_function()
+    if workers > 1:
+        scans = scan_directories_parallel(path, workers, file_sink=settings.file_table, scan_function=scan_function)
+        tree = _build_directory_tree(path, last_modified, scans.pop)
+    else:
+        def _scan(directory: str) -> DirectoryScan:
+            files, directories = scan_function(directory)
+            if settings.file_table is not None:
+                return settings.file_table.add_files(directory, files), directories
+            return files, directories
+
+        tree = _build_directory_tree(path, last_modified, _scan)
+    return tree, settings.file_table, cache, hard_links
+
+
+def _build_directory_tree_processes(
+    path: str,
+    last_modified: float,
+    scanner_settings: ScannerSettings,
+    progress_callback: Optional[ProgressPrinter] = None
+) -> DirectoryTree:
+    """
+    Scan each top level sub directory of path in a pool of processes, and merge the sub trees.
+    """
+    file_sink = scanner_settings.get_file_sink()
+    cache = scanner_settings.cache
+    files, directories = scanner_settings.get_scan_function()(path)
     if progress_callback:
         progress_callback.on_directory_tree_progress(files, directories)
 
-    sub_trees = [build_directory_tree(d.absolute_path, progress_callback) for d in directories]
+    # Sub trees come back compact when the parent isn't holding FileMetadata lists, so less has to be pickled
+    compact = file_sink is not None
+    sub_trees: List[DirectoryTree] = []
+
+    # Worker processes are spawned rather than forked, as the parent has threads running (e.g. the progress bar)
+    with ProcessPoolExecutor(
+        max_workers=scanner_settings.processes, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = [
+            executor.submit(
+                _build_sub_tree,
+                d.absolute_path,
+                d.last_modified,
+                scanner_settings.workers,
+                compact,
+                cache.sub_cache(d.absolute_path) if cache is not None else None,
+                scanner_settings.scan_filter,
+                HardLinkIndex() if scanner_settings.hard_links is not None else None
+            )
+            for d in directories
+        ]
+        for future in futures:
+            sub_tree, sub_tree_table, sub_tree_cache, sub_tree_hard_links = future.result()
+
+            if cache is not None:
+                assert sub_tree_cache is not None
+                cache.merge(sub_tree_cache)
+            if scanner_settings.hard_links is not None:
+                assert sub_tree_hard_links is not None
+                scanner_settings.hard_links.merge(sub_tree_hard_links)
+
+            if isinstance(file_sink, FileTable):
+                file_sink.merge(sub_tree_table, sub_tree)
+            elif isinstance(file_sink, ScanStore):
+                stack = [sub_tree]
+                while stack:
+                    tree = stack.pop()
+                    tree.files = file_sink.add_files(tree.path, tree.files)
+                    stack.extend(tree.directories)
+
+            if progress_callback:
+                # The sub tree's own directory was counted with the scan of the root
+                progress_callback.on_scan_progress(
+                    count_files(sub_tree), len(get_all_directories(sub_tree)) - 1, sub_tree.total_size_bytes
+                )
+            sub_trees.append(sub_tree)
 
     # Sort sub_trees by total_size_bytes, smallest to largest
     sub_trees.sort(key=lambda t: t.total_size_bytes)
 
-    total_size = sum(f.size for f in files) + sum(t.total_size_bytes for t in sub_trees)
-
     return DirectoryTree(
-        files=files,
-        total_size_bytes=total_size,
+        files=file_sink.add_files(path, files) if file_sink is not None else files,
+        total_size_bytes=sum(f.size for f in files) + sum(t.total_size_bytes for t in sub_trees),
         directories=sub_trees,
         path=path,
         absolute_path=os.path.abspath(path),
-        last_modified=os.stat(os.path.abspath(path)).st_mtime
+        last_modified=last_modified
     )
 
 
+def scan_directories_parallel(
+    path: str,
+    workers: int,
+    progress_callback: Optional[ProgressPrinter] = None,
+    file_sink: Optional[Union[ScanStore, FileTable]] = None,
+    scan_function: Callable[[str], Tuple[List[FileMetadata], List[DirectoryMetadata]]] = scan_directory
+) -> Dict[str, DirectoryScan]:
+    """
+    Scan path and every directory below it using a pool of worker threads, returning the scan of each directory keyed
+    by its path. Workers take directories from a shared work queue, so on high latency filesystems many listdir / stat
+    round trips are in flight at once.
+
+    With a store or file table, files are added to it as each directory's scan arrives (on the calling thread). Each
+    directory is listed with scan_function, which is called from the worker threads.
+    """
+    work_queue: "queue.Queue[Optional[str]]" = queue.Queue()
+    result_queue: "queue.Queue[Tuple[str, Optional[DirectoryScan], Optional[Exception]]]" = queue.Queue()
+    stop = threading.Event()
+
+    def _worker() -> None:
+        while True:
+            directory = work_queue.get()
+            if directory is None or stop.is_set():
+                return
+            try:
+                result_queue.put((directory, scan_function(directory), None))
+            except Exception as e:
+                result_queue.put((directory, None, e))
+
+    threads = [threading.Thread(target=_worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    scans: Dict[str, DirectoryScan] = {}
+    work_queue.put(path)
+    outstanding = 1
+
+    try:
+        while outstanding > 0:
+            directory, scan, error = result_queue.get()
+            outstanding -= 1
+            if error is not None:
+                raise error
+            assert scan is not None
+
+            files, directories = scan
+            if progress_callback:
+                progress_callback.on_directory_tree_progress(files, directories)
+            if file_sink is not None:
+                scans[directory] = (file_sink.add_files(directory, files), directories)
+            else:
+                scans[directory] = scan
+
+            for d in directories:
+                work_queue.put(d.absolute_path)
+                outstanding += 1
+    finally:
+        stop.set()
+        for _ in threads:
+            work_queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    return scans
+
+
+def iter_files(directory_tree: DirectoryTree) -> Iterator[FileMetadata]:
+    """
+    Iterate over all files in a directory tree, recursively, without copying them or building intermediate lists.
+    """
+    stack = [directory_tree]
+    while stack:
+        tree = stack.pop()
+        yield from tree.files
+        stack.extend(reversed(tree.directories))
+
+
+def count_files(directory_tree: DirectoryTree) -> int:
+    """
+    Count the files in a directory tree, recursively.
+    """
+    n_files = 0
+    stack = [directory_tree]
+    while stack:
+        tree = stack.pop()
+        n_files += len(tree.files)
+        stack.extend(tree.directories)
+    return n_files
+
+
 def get_all_files(directory_tree: DirectoryTree) -> List[FileMetadata]:
     """
-    Get all files in a directory tree, recursively.
+    Get all files in a directory tree, recursively. The list holds the tree's own FileMetadata, not copies.
     """
-    files = copy.deepcopy(directory_tree.files)
-    for sub_tree in directory_tree.directories:
-        files += get_all_files(sub_tree)
-    return files
+    return list(iter_files(directory_tree))
 
 
 def get_all_directories(directory_tree: DirectoryTree) -> List[str]:
     """
     Get all directories in a directory tree, recursively.
     """
-    directories = [directory_tree.absolute_path]
-    for sub_tree in directory_tree.directories:
-        directories += get_all_directories(sub_tree)
+    directories: List[str] = []
+    stack = [directory_tree]
+    while stack:
+        tree = stack.pop()
+        directories.append(tree.absolute_path)
+        stack.extend(reversed(tree.directories))
     return directories
 
 
@@ -225,40 +1558,72 @@ def build_archive_path(input_directory: str, absolute_path: str) -> str:
     return last_folder_of_input + absolute_path[len(input_directory):]
 
 
-def build_full_listing(directory_tree: DirectoryTree, input_directory: str, line_prefix: str = "") -> Tuple[str, str]:
+def set_archive_directories(directory_tree: DirectoryTree, input_directory: str) -> None:
     """
-    Build a full listing of a directory tree which can be saved as a text file.
-    Returns a tuple of (listing_header, listing_body).
+    Work out the archive path of each directory in a tree once, and record it on the directory's files, so that the
+    archive path of each file doesn't have to be built from its absolute path every time it is written.
     """
+    stack = [directory_tree]
+    while stack:
+        tree = stack.pop()
+        # With a trailing separator, as the files of the directory are at os.path.join(tree.path, name)
+        archive_directory = build_archive_path(input_directory, os.path.join(tree.path, ""))
+        if isinstance(tree.files, FileSequence):
+            tree.files.set_archive_directory(archive_directory)
+        else:
+            for f in tree.files:
+                f.archive_directory = archive_directory
+        stack.extend(tree.directories)
+
+
+def get_archive_path(f: FileMetadata, input_directory: str) -> str:
+    """
+    The archive path of a file, from its archive directory where that has been set.
+    """
+    if f.archive_directory is not None:
+        return f.archive_directory + f.path
+    return build_archive_path(input_directory, f.absolute_path)
 
-    max_file_size_bytes: int = 0
-    total_files: int = 0
-
-    full_listing = ""
 
-    # Recurve over the directory tree and print out the files and directories
-    def _recurse(directory_tree: DirectoryTree) -> None:
-        nonlocal total_files, max_file_size_bytes
-        nonlocal full_listing
-        total_files += len(directory_tree.files)
-        for f in directory_tree.files:
-            date_str = format_last_modified_time(f.last_modified)
-            archive_path = build_archive_path(input_directory, f.absolute_path)
-            full_listing += f"{line_prefix}{date_str} {format_bytes(f.size).ljust(10)} {archive_path}  {f.size}\n"
-            if f.size > max_file_size_bytes:
-                max_file_size_bytes = f.size
-        for d in directory_tree.directories:
-            _recurse(d)
+@dataclass
+class ListingTotals:
+    files: int = 0
+    max_file_size_bytes: int = 0
+    links: int = 0
+    link_size_bytes: int = 0
 
-    _recurse(directory_tree)
 
+def get_listing_totals(directory_tree: DirectoryTree, hard_links: Optional[Dict[str, str]] = None) -> ListingTotals:
+    """
+    Totals for the header of a listing, worked out before any lines are written so that the listing can be streamed.
+    """
+    totals = ListingTotals()
+    stack = [directory_tree]
+    while stack:
+        tree = stack.pop()
+        totals.files += len(tree.files)
+        for f in tree.files:
+            if f.size > totals.max_file_size_bytes:
+                totals.max_file_size_bytes = f.size
+            if hard_links and f.absolute_path in hard_links:
+                totals.links += 1
+                totals.link_size_bytes += f.size
+        stack.extend(tree.directories)
+    return totals
+
+
+def build_listing_header(directory_tree: DirectoryTree, totals: ListingTotals) -> str:
     # Get the final directory of the path
     directory_name = os.path.basename(os.path.normpath(directory_tree.absolute_path))
     title = f"Directory Listing for: {directory_name}"
     total_size_str = f"Total Size: { format_bytes(directory_tree.total_size_bytes)}"
-    total_files_str = f"Total Files: {total_files:,}"
-    max_file_size_str = f"Max File Size: {format_bytes(max_file_size_bytes)}"
+    total_files_str = f"Total Files: {totals.files:,}"
+    max_file_size_str = f"Max File Size: {format_bytes(totals.max_file_size_bytes)}"
     box_size = 100
+    hard_links_line = ""
+    if totals.links > 0:
+        hard_links_str = f"Hard Links: {totals.links:,} ({format_bytes(totals.link_size_bytes)} not archived again)"
+        hard_links_line = "*" + hard_links_str.center(box_size - 2) + "*\n"
     header = (
         "*" * box_size + "\n"
         + "*" + " " * (box_size - 2) + "*\n"
@@ -266,85 +1631,348 @@ def build_full_listing(directory_tree: DirectoryTree, input_directory: str, line
         + "*" + total_size_str.center(box_size - 2) + "*\n"
         + "*" + max_file_size_str.center(box_size - 2) + "*\n"
         + "*" + total_files_str.center(box_size - 2) + "*\n"
+        + hard_links_line
         + "*" + " " * (box_size - 2) + "*\n"
         + "*" * box_size + "\n\n"
         + "Printed on: " + time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()) + "\n\n"
         + "Running with input directory: " + directory_tree.absolute_path + "\n\n"
     )
 
-    return header, full_listing
+    return header
 
 
-def build_react_chonky_json_listing(directory_tree: DirectoryTree, input_directory: str) -> dict:
+# Number of files inserted into a manifest at a time
+MANIFEST_BATCH_ROWS = 8192
+
+
+class Manifest:
     """
-    Build a JSON listing of a directory tree which is in the correct format for the Chonky ReactJS file manager.
+    A queryable record of an archive, saved as Manifest.sqlite: every directory and file by its archive path, with
+    sizes, modification times and the chunk holding each file, and the size and SHA256 hash of each chunk. For example,
+    the chunks which hold files within a directory are:
+
+        SELECT DISTINCT chunk FROM files WHERE path LIKE 'myProject/data/%'
+
+    Directories and files are added as FullListing.txt is written (see iter_listing_lines), within one transaction,
+    and the indexes are created when the manifest is closed, once all rows have been inserted.
     """
+    FILE_NAME = "Manifest.sqlite"
+
+    def __init__(self, path: str):
+        if os.path.exists(path):
+            raise RuntimeError(f"Manifest {path} already exists.")
+
+        self._connection = sqlite3.connect(path)
+        self._next_directory_id = 0
+        self._directories: List[Tuple[int, Optional[int], str, str, float, int, int]] = []
+        self._files: List[Tuple[int, str, str, int, float, Optional[int], Optional[str]]] = []
+
+        # A manifest which isn't closed is incomplete anyway, so durability is not needed while it is written
+        self._connection.execute("PRAGMA journal_mode = OFF")
+        self._connection.execute("PRAGMA synchronous = OFF")
+        self._connection.execute(
+            "CREATE TABLE directories ("
+            " id INTEGER PRIMARY KEY, parent_id INTEGER, path TEXT, name TEXT, last_modified REAL,"
+            " file_count INTEGER, total_size_bytes INTEGER"
+            ")"
+        )
+        # link_target is the archive path of the file archived in place of a hard link
+        self._connection.execute(
+            "CREATE TABLE files ("
+            " id INTEGER PRIMARY KEY, directory_id INTEGER, path TEXT, name TEXT, size INTEGER, last_modified REAL,"
+            " chunk INTEGER, link_target TEXT"
+            ")"
+        )
+        self._connection.execute(
+            "CREATE TABLE chunks (id INTEGER PRIMARY KEY, file_name TEXT, file_count INTEGER, size_bytes INTEGER,"
+            " sha256 TEXT)"
+        )
+
+    def add_directory(self, directory_tree: DirectoryTree, parent_id: Optional[int], input_directory: str) -> int:
+        """
+        Add a directory (but not its files or sub directories), returning its id.
+        """
+        directory_id = self._next_directory_id
+        self._next_directory_id += 1
+        archive_path = build_archive_path(input_directory, directory_tree.path)
+        self._directories.append((
+            directory_id, parent_id, archive_path, os.path.basename(archive_path), directory_tree.last_modified,
+            len(directory_tree.files), directory_tree.total_size_bytes
+        ))
+        return directory_id
+
+    def add_file(self, directory_id: int, f: FileMetadata, archive_path: str, link_target: Optional[str]) -> None:
+        self._files.append((
+            directory_id, archive_path, f.path, f.size, f.last_modified,
+            f.present_in_chunks[0] if f.present_in_chunks else None, link_target
+        ))
+        if len(self._files) >= MANIFEST_BATCH_ROWS:
+            self._flush()
+
+    def add_chunks(self, chunks: List[DirectoryTree], chunk_directory: Optional[str] = None) -> None:
+        """
+        Add the chunks, with the hashes from their ChunkNNNNNNNHash.txt files if chunk_directory is given.
+        """
+        rows = []
+        for chunk_number, chunk in enumerate(chunks):
+            sha256 = None
+            if chunk_directory is not None:
+                hash_file_name = os.path.join(chunk_directory, f"Chunk{chunk_number:07d}Hash.txt")
+                if os.path.exists(hash_file_name):
+                    with open(hash_file_name) as f:
+                        # As written by get_sha_sum: "SHA256: <hash>  <file name>"
+                        words = f.read().split()
+                    sha256 = words[1] if len(words) > 1 else None
+            rows.append(
+                (chunk_number, f"Chunk{chunk_number:07d}.zip", count_files(chunk), chunk.total_size_bytes, sha256)
+            )
+        self._connection.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?)", rows)
+
+    def _flush(self) -> None:
+        self._connection.executemany("INSERT INTO directories VALUES (?, ?, ?, ?, ?, ?, ?)", self._directories)
+        self._connection.executemany("INSERT INTO files VALUES (NULL, ?, ?, ?, ?, ?, ?, ?)", self._files)
+        self._directories = []
+        self._files = []
+
+    def close(self) -> None:
+        """
+        Insert any remaining rows, create the indexes and save the manifest.
+        """
+        self._flush()
+        self._connection.execute("CREATE UNIQUE INDEX directories_path ON directories (path)")
+        self._connection.execute("CREATE INDEX directories_parent_id ON directories (parent_id)")
+        self._connection.execute("CREATE UNIQUE INDEX files_path ON files (path)")
+        self._connection.execute("CREATE INDEX files_directory_id ON files (directory_id)")
+        self._connection.execute("CREATE INDEX files_chunk ON files (chunk)")
+        self._connection.commit()
+        self._connection.close()
+
+
+def iter_listing_lines(
+    directory_tree: DirectoryTree,
+    input_directory: str,
+    line_prefix: str = "",
+    hard_links: Optional[Dict[str, str]] = None,
+    manifest: Optional[Manifest] = None
+) -> Iterator[str]:
+    """
+    Iterate over the lines of a listing of a directory tree, one per file.
+
+    Files which are hard links (keys of hard_links) are listed with a reference to the file archived in their place.
+    With a manifest, each directory and file is also added to it as it is listed.
+    """
+    # Walk the directory tree depth first and list the files. Each stack entry is a directory and its parent's id in
+    # the manifest.
+    stack: List[Tuple[DirectoryTree, Optional[int]]] = [(directory_tree, None)]
+    while stack:
+        tree, parent_id = stack.pop()
+        directory_id = manifest.add_directory(tree, parent_id, input_directory) if manifest is not None else None
+        for f in tree.files:
+            date_str = format_last_modified_time(f.last_modified)
+            archive_path = get_archive_path(f, input_directory)
+            link_target = hard_links.get(f.absolute_path) if hard_links else None
+            link_archive_path = None
+            if link_target is None:
+                yield f"{line_prefix}{date_str} {format_bytes(f.size).ljust(10)} {archive_path}  {f.size}\n"
+            else:
+                link_archive_path = build_archive_path(input_directory, link_target)
+                yield (
+                    f"{line_prefix}{date_str} {format_bytes(f.size).ljust(10)} {archive_path}  {f.size}"
+                    f" -> {link_archive_path}\n"
+                )
+            if manifest is not None:
+                assert directory_id is not None
+                manifest.add_file(directory_id, f, archive_path, link_archive_path)
+        stack.extend((d, directory_id) for d in reversed(tree.directories))
+
+
+# File extension added to the listing outputs for each compression
+LISTING_COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
 
-    current_obj_id = 0
-    file_map = {}
 
-    def _build_name(path: str) -> str:
-        return os.path.basename(os.path.normpath(build_archive_path(input_directory, path)))
+def _import_zstandard() -> Any:
+    try:
+        import zstandard  # type: ignore
+    except ImportError:
+        raise RuntimeError("zstd compression needs the zstandard package (pip install zstandard).") from None
+    return zstandard
+
+
+def open_listing_output(path: str, compression: Optional[str] = None) -> TextIO:
+    """
+    Open a text file to write a listing to. With a compression ("gzip" or "zstd"), the text is compressed as it is
+    written, so the uncompressed listing is never held in memory or written to disk. zstd compresses with a thread per
+    CPU core, and needs the zstandard package.
+    """
+    if compression is None:
+        return open(path, "w")
+    if compression == "gzip":
+        return gzip.open(path, "wt", compresslevel=6)
+    if compression == "zstd":
+        compressor = _import_zstandard().ZstdCompressor(level=3, threads=-1)
+        return io.TextIOWrapper(compressor.stream_writer(open(path, "wb")))
+    raise ValueError(f"Unknown listing compression {compression}.")
+
+
+def open_listing_input(path: str, compression: Optional[str] = None) -> TextIO:
+    """
+    Open a listing written by open_listing_output to read it back, decompressing it as it is read.
+    """
+    if compression is None:
+        return open(path, "r")
+    if compression == "gzip":
+        return gzip.open(path, "rt")
+    if compression == "zstd":
+        decompressor = _import_zstandard().ZstdDecompressor()
+        return io.TextIOWrapper(decompressor.stream_reader(open(path, "rb")))
+    raise ValueError(f"Unknown listing compression {compression}.")
+
+
+# Number of listing lines joined into each write
+LISTING_BLOCK_LINES = 8192
+
+
+def write_full_listing(
+    f: TextIO,
+    directory_tree: DirectoryTree,
+    input_directory: str,
+    line_prefix: str = "",
+    hard_links: Optional[Dict[str, str]] = None,
+    header: Optional[str] = None,
+    manifest: Optional[Manifest] = None
+) -> None:
+    """
+    Write a full listing of a directory tree to a file, streaming the lines in blocks rather than building the whole
+    listing in memory. Unless the header has already been built, its totals are worked out first.
+
+    With a manifest, the directories and files are added to it in the same walk of the tree.
+    """
+    if header is None:
+        header = build_listing_header(directory_tree, get_listing_totals(directory_tree, hard_links))
+    f.write(header)
+
+    block: List[str] = []
+    for line in iter_listing_lines(directory_tree, input_directory, line_prefix, hard_links, manifest):
+        block.append(line)
+        if len(block) == LISTING_BLOCK_LINES:
+            f.write("".join(block))
+            block = []
+    f.write("".join(block))
+
+
+def build_full_listing(
+    directory_tree: DirectoryTree,
+    input_directory: str,
+    line_prefix: str = "",
+    hard_links: Optional[Dict[str, str]] = None
+) -> Tuple[str, str]:
+    """
+    Build a full listing of a directory tree which can be saved as a text file.
+    Returns a tuple of (listing_header, listing_body).
 
-    def _recurse(directory_tree: DirectoryTree, parent_id: str = "") -> None:
-        nonlocal current_obj_id
-        nonlocal file_map
+    For large trees, write_full_listing writes the same listing without holding it in memory.
+    """
+    header = build_listing_header(directory_tree, get_listing_totals(directory_tree, hard_links))
+    return header, "".join(iter_listing_lines(directory_tree, input_directory, line_prefix, hard_links))
 
-        this_dir_id = str(current_obj_id)
-        this_dir_child_ids = []
 
-        present_in_chunks = []
-        if directory_tree.present_in_chunks is not None:
-            present_in_chunks = directory_tree.present_in_chunks
+def iter_react_chonky_json_listing(directory_tree: DirectoryTree, input_directory: str) -> Iterator[Tuple[str, dict]]:
+    """
+    Iterate over the entries of the Chonky file map of a directory tree (see build_react_chonky_json_listing) as (id,
+    entry) pairs, in the order of the file map: a directory, then its files, then each sub directory in turn.
 
-        file_map[this_dir_id] = {
+    The id of each sub directory is worked out in advance from the number of entries in the sub trees before it, so
+    each directory's entry is complete when it is reached.
+    """
+    # Number of entries in each sub tree (the directory, its files and everything below it), by id of the tree. Each
+    # stack entry is a directory, and whether its sub directories have been counted.
+    n_entries: Dict[int, int] = {}
+    count_stack = [(directory_tree, False)]
+    while count_stack:
+        tree, counted = count_stack.pop()
+        if counted:
+            n_entries[id(tree)] = 1 + len(tree.files) + sum(n_entries[id(d)] for d in tree.directories)
+        else:
+            count_stack.append((tree, True))
+            count_stack.extend((d, False) for d in tree.directories)
+
+    # Each stack entry is a directory, with its id and its parent's id
+    stack = [(directory_tree, 0, "")]
+    while stack:
+        tree, this_id, parent_id = stack.pop()
+        this_dir_id = str(this_id)
+
+        sub_directories = []
+        child_id = this_id + 1 + len(tree.files)
+        for d in tree.directories:
+            sub_directories.append((d, child_id, this_dir_id))
+            child_id += n_entries[id(d)]
+
+        entry = {
             "id": this_dir_id,
-            "name": _build_name(directory_tree.path),
+            "name": os.path.basename(os.path.normpath(build_archive_path(input_directory, tree.path))),
             "isDir": True,
-            "modDate": format_last_modified_time_as_iso(directory_tree.last_modified),
-            "childrenCount": len(directory_tree.directories),
+            "modDate": format_last_modified_time_as_iso(tree.last_modified),
+            "childrenCount": len(tree.directories),
             "parentId": parent_id,
-            "presentInChunks": present_in_chunks
+            "presentInChunks": tree.present_in_chunks if tree.present_in_chunks is not None else [],
+            "childrenIds": [str(i) for i in range(this_id + 1, this_id + 1 + len(tree.files))]
+            + [str(d_id) for _, d_id, _ in sub_directories]
         }
-
         if parent_id == "":
-            file_map[this_dir_id].pop("parentId")
-
-        for f in directory_tree.files:
-            current_obj_id += 1
-            this_child_id = str(current_obj_id)
-            present_in_chunks = []
-            if f.present_in_chunks is not None:
-                present_in_chunks = f.present_in_chunks
-
-            file_map[this_child_id] = {
-                "id": this_child_id,
-                "name": _build_name(f.absolute_path),
+            entry.pop("parentId")
+        yield this_dir_id, entry
+
+        for file_id, f in enumerate(tree.files, this_id + 1):
+            yield str(file_id), {
+                "id": str(file_id),
+                "name": os.path.basename(get_archive_path(f, input_directory)),
                 "isDir": False,
                 "isHidden": False,
                 "modDate": format_last_modified_time_as_iso(f.last_modified),
                 "size": f.size,
                 "parentId": this_dir_id,
-                "presentInChunks": present_in_chunks
+                "presentInChunks": f.present_in_chunks if f.present_in_chunks is not None else []
             }
-            this_dir_child_ids.append(this_child_id)
 
-        for d in directory_tree.directories:
-            current_obj_id += 1
-            this_child_id = str(current_obj_id)
-            _recurse(d, this_dir_id)
-            this_dir_child_ids.append(this_child_id)
+        stack.extend(reversed(sub_directories))
 
-        file_map[this_dir_id]["childrenIds"] = this_dir_child_ids
 
-    _recurse(directory_tree)
+def build_react_chonky_json_listing(directory_tree: DirectoryTree, input_directory: str) -> dict:
+    """
+    Build a JSON listing of a directory tree which is in the correct format for the Chonky ReactJS file manager.
 
-    return file_map  # noqa
+    For large trees, write_react_chonky_json_listing writes the same JSON without building the file map in memory.
+    """
+    return dict(iter_react_chonky_json_listing(directory_tree, input_directory))
 
 
-def divide_tree_into_chunks(directory_tree: DirectoryTree, chunker_settings: ChunkerSettings) -> List[DirectoryTree]:
+def write_react_chonky_json_listing(f: TextIO, directory_tree: DirectoryTree, input_directory: str) -> None:
+    """
+    Write the JSON listing of a directory tree for Chonky to a file, one entry at a time, so that memory use doesn't
+    grow with the number of files. The output is the same as json.dump of build_react_chonky_json_listing.
+    """
+    f.write("{")
+    block: List[str] = []
+    separator = ""
+    for entry_id, entry in iter_react_chonky_json_listing(directory_tree, input_directory):
+        block.append(f"{separator}{json.dumps(entry_id)}: {json.dumps(entry)}")
+        separator = ", "
+        if len(block) == LISTING_BLOCK_LINES:
+            f.write("".join(block))
+            block = []
+    f.write("".join(block))
+    f.write("}")
+
+
+def divide_tree_into_chunks(
+    directory_tree: DirectoryTree, chunker_settings: ChunkerSettings, hard_links: Optional[Dict[str, str]] = None
+) -> List[DirectoryTree]:
     """
     Break a directory tree into chunks.
+
+    Files which are hard links (keys of hard_links) are placed in chunks, so they are listed, but take up no space as
+    they aren't archived again.
     """
     def _fresh_chunk(directory_tree: DirectoryTree, chunk_no: int) -> DirectoryTree:
         return DirectoryTree(
@@ -358,93 +1986,137 @@ def divide_tree_into_chunks(directory_tree: DirectoryTree, chunker_settings: Chu
         )
 
     def _set_file_chunk_no(file: FileMetadata, chunk_no: int) -> None:
-        if file.present_in_chunks is None:
-            file.present_in_chunks = []
-        file.present_in_chunks.append(chunk_no)
+        # Assigned rather than appended to, so that a FileView writes the change through to its table
+        file.present_in_chunks = (file.present_in_chunks or []) + [chunk_no]
 
     def _set_chunk_no(directory_tree: DirectoryTree, chunk_no: int) -> None:
-        if directory_tree.present_in_chunks is None:
-            directory_tree.present_in_chunks = []
-        directory_tree.present_in_chunks.append(chunk_no)
-
-        for f in directory_tree.files:
-            _set_file_chunk_no(f, chunk_no)
+        stack = [directory_tree]
+        while stack:
+            tree = stack.pop()
+            if tree.present_in_chunks is None:
+                tree.present_in_chunks = []
+            tree.present_in_chunks.append(chunk_no)
+
+            if isinstance(tree.files, FileSequence):
+                tree.files.set_chunk_no(chunk_no)
+            else:
+                for f in tree.files:
+                    _set_file_chunk_no(f, chunk_no)
 
-        for d in directory_tree.directories:
-            _set_chunk_no(d, chunk_no)
+            stack.extend(tree.directories)
 
     chunks: List[DirectoryTree] = []
     current_chunk = _fresh_chunk(directory_tree, 0)
     chunks.append(current_chunk)
 
-    def _recurse(directory_tree: DirectoryTree) -> None:
+    def _add_directory(tree: DirectoryTree, d: DirectoryTree) -> Optional[DirectoryTree]:
+        """
+        Place sub directory d of tree. Returns d if it needs to be split up.
+        """
         nonlocal current_chunk
-        nonlocal chunks
 
-        for d in directory_tree.directories:
-            if current_chunk.total_size_bytes + d.total_size_bytes > chunker_settings.get_max_target_size_bytes():
-                if current_chunk.total_size_bytes > chunker_settings.get_min_target_size_bytes():
-                    # Current chunk is finished, create a new chunk
-                    current_chunk = _fresh_chunk(directory_tree, len(chunks))
-                    chunks.append(current_chunk)
+        if current_chunk.total_size_bytes + d.total_size_bytes > chunker_settings.get_max_target_size_bytes():
+            if current_chunk.total_size_bytes > chunker_settings.get_min_target_size_bytes():
+                # Current chunk is finished, create a new chunk
+                current_chunk = _fresh_chunk(tree, len(chunks))
+                chunks.append(current_chunk)
 
-                    if d.total_size_bytes > chunker_settings.get_max_target_size_bytes():
-                        # We need to split this directory up
-                        _recurse(d)
-                    else:
-                        # We add this directory to the new chunk
-                        _set_chunk_no(d, len(chunks) - 1)
-                        current_chunk.directories.append(d)
-                        current_chunk.total_size_bytes += d.total_size_bytes
-                else:
-                    # Current chunk is too small, but we can't add any more directories to it because
-                    # each is too large to fit (we are iterating through directories ordered by size)
-                    # We need to split this directory
-                    _recurse(d)
-            else:
-                # When we add this directory, we don't exceed our max target size. So we can either add it to
-                # the current chunk, or create a new chunk and add it to that.
-                if current_chunk.total_size_bytes > chunker_settings.target_size_bytes:
-                    current_chunk = _fresh_chunk(directory_tree, len(chunks))
-                    chunks.append(current_chunk)
+                if d.total_size_bytes > chunker_settings.get_max_target_size_bytes():
+                    # We need to split this directory up
+                    return d
 
+                # We add this directory to the new chunk
                 _set_chunk_no(d, len(chunks) - 1)
                 current_chunk.directories.append(d)
                 current_chunk.total_size_bytes += d.total_size_bytes
+                return None
+
+            # Current chunk is too small, but we can't add any more directories to it because
+            # each is too large to fit (we are iterating through directories ordered by size)
+            # We need to split this directory
+            return d
+
+        # When we add this directory, we don't exceed our max target size. So we can either add it to
+        # the current chunk, or create a new chunk and add it to that.
+        if current_chunk.total_size_bytes > chunker_settings.target_size_bytes:
+            current_chunk = _fresh_chunk(tree, len(chunks))
+            chunks.append(current_chunk)
+
+        _set_chunk_no(d, len(chunks) - 1)
+        current_chunk.directories.append(d)
+        current_chunk.total_size_bytes += d.total_size_bytes
+        return None
+
+    def _add_file(tree: DirectoryTree, index: int, f: FileMetadata, size: int) -> None:
+        if isinstance(tree.files, FileSequence):
+            # Only the position of the file is recorded, so the chunk's files are read back from the sequence
+            if isinstance(current_chunk.files, list):
+                current_chunk.files = FileRuns([(current_chunk.files, 0, len(current_chunk.files))])
+            assert isinstance(current_chunk.files, FileRuns)
+            current_chunk.files.append(tree.files, index, f.size)
+        else:
+            _set_file_chunk_no(f, len(chunks) - 1)
+            if isinstance(current_chunk.files, FileRuns):
+                current_chunk.files.append(tree.files, index, f.size)
+            else:
+                assert isinstance(current_chunk.files, list)
+                current_chunk.files.append(f)
+        current_chunk.total_size_bytes += size
+
+    def _add_files(tree: DirectoryTree) -> None:
+        nonlocal current_chunk
 
-        for f in directory_tree.files:
-            if current_chunk.total_size_bytes + f.size > chunker_settings.get_max_target_size_bytes():
+        # The files of a directory go to consecutive chunks, so which chunk each file is in is recorded as runs of
+        # (start, stop, chunk number)
+        chunk_runs: List[Tuple[int, int, int]] = []
+        for index, f in enumerate(tree.files):
+            size = 0 if hard_links and f.absolute_path in hard_links else f.size
+            if current_chunk.total_size_bytes + size > chunker_settings.get_max_target_size_bytes():
                 if current_chunk.total_size_bytes > chunker_settings.get_min_target_size_bytes():
                     # Current chunk is finished, create a new chunk
-                    current_chunk = _fresh_chunk(directory_tree, len(chunks))
+                    current_chunk = _fresh_chunk(tree, len(chunks))
                     chunks.append(current_chunk)
-
-                    _set_file_chunk_no(f, len(chunks) - 1)
-                    current_chunk.files.append(f)
-                    current_chunk.total_size_bytes += f.size
                 else:
                     is_current_chunk_empty = current_chunk.total_size_bytes == 0
-                    is_file_greater_than_target = f.size > chunker_settings.target_size_bytes
+                    is_file_greater_than_target = size > chunker_settings.target_size_bytes
 
                     if is_file_greater_than_target and not is_current_chunk_empty:
-                        current_chunk = _fresh_chunk(directory_tree, len(chunks))
+                        current_chunk = _fresh_chunk(tree, len(chunks))
                         chunks.append(current_chunk)
-
-                    _set_file_chunk_no(f, len(chunks) - 1)
-                    current_chunk.files.append(f)
-                    current_chunk.total_size_bytes += f.size
             else:
                 # When we add this file, we don't exceed our max target size. So we can either add it to
                 # the current chunk, or create a new chunk and add it to that.
                 if current_chunk.total_size_bytes > chunker_settings.target_size_bytes:
-                    current_chunk = _fresh_chunk(directory_tree, len(chunks))
+                    current_chunk = _fresh_chunk(tree, len(chunks))
                     chunks.append(current_chunk)
 
-                _set_file_chunk_no(f, len(chunks) - 1)
-                current_chunk.files.append(f)
-                current_chunk.total_size_bytes += f.size
-
-    _recurse(directory_tree)
+            _add_file(tree, index, f, size)
+            if chunk_runs and chunk_runs[-1][2] == len(chunks) - 1:
+                chunk_runs[-1] = (chunk_runs[-1][0], index + 1, len(chunks) - 1)
+            else:
+                chunk_runs.append((index, index + 1, len(chunks) - 1))
+
+        if isinstance(tree.files, FileSequence):
+            # The files read from a FileSequence may be copies, so record which chunk each was added to once they have
+            # all been read
+            for start, stop, chunk_no in chunk_runs:
+                tree.files.set_chunk_no(chunk_no, start, stop)
+
+    # Depth first walk with an explicit stack. Each stack entry is a directory together with the sub directories which
+    # haven't been placed yet. Sub directories which are too large are split up before moving on to the next one, and
+    # a directory's own files are placed once all of its sub directories are.
+    stack = [(directory_tree, iter(directory_tree.directories))]
+    while stack:
+        tree, directories = stack[-1]
+        d = next(directories, None)
+        if d is None:
+            stack.pop()
+            _add_files(tree)
+            continue
+
+        to_split = _add_directory(tree, d)
+        if to_split is not None:
+            stack.append((to_split, iter(to_split.directories)))
 
     return chunks
 
@@ -460,9 +2132,15 @@ def get_sha_sum(file_path: str) -> str:
     ).stdout.decode("utf-8")
 
 
-def compress_chunk(chunk: DirectoryTree, chunk_number: int, output_directory: str, input_directory: str) -> None:
+def compress_chunk(
+    chunk: DirectoryTree,
+    chunk_number: int,
+    output_directory: str,
+    input_directory: str,
+    hard_links: Optional[Dict[str, str]] = None
+) -> None:
     """
-    Compress a chunk into a zip file.
+    Compress a chunk into a zip file. Files which are hard links (keys of hard_links) are listed but not compressed.
     """
     # Create the output directory if it doesn't exist
     if not os.path.exists(output_directory):
@@ -473,8 +2151,6 @@ def compress_chunk(chunk: DirectoryTree, chunk_number: int, output_directory: st
     if not os.path.exists(chunk_directory):
         os.makedirs(chunk_directory)
 
-    header, listing = build_full_listing(chunk, input_directory)
-
     zip_file_name = os.path.join(chunk_directory, f"Chunk{chunk_number:07d}.zip")
     listing_file_name = os.path.join(chunk_directory, f"Chunk{chunk_number:07d}Listing.txt")
     check_file_name = os.path.join(chunk_directory, f"Chunk{chunk_number:07d}Check.txt")
@@ -486,15 +2162,14 @@ def compress_chunk(chunk: DirectoryTree, chunk_number: int, output_directory: st
         raise RuntimeError("One or more output files already exist - resume is not supported. Aborting.")
 
     with open(listing_file_name, "w") as f:
-        f.write(header)
-        f.write(listing)
-
-    input_files = get_all_files(chunk)
+        write_full_listing(f, chunk, input_directory, hard_links=hard_links)
 
     with zipfile.ZipFile(zip_file_name, "w", zipfile.ZIP_DEFLATED, compresslevel=7) as zip_file:
-        for in_file in input_files:
+        for in_file in iter_files(chunk):
+            if hard_links and in_file.absolute_path in hard_links:
+                continue
             # To form the arcname, remove the input directory from the start file path
-            zip_file.write(in_file.absolute_path, arcname=build_archive_path(input_directory, in_file.absolute_path))
+            zip_file.write(in_file.absolute_path, arcname=get_archive_path(in_file, input_directory))
 
     with open(hash_file_name, "w") as f:
         f.write(get_sha_sum(zip_file_name))
@@ -502,7 +2177,7 @@ def compress_chunk(chunk: DirectoryTree, chunk_number: int, output_directory: st
     # Create the check file. Load the zip file from disk, and read all of the files. Check that every file in the
     # input is present, and the size of each file is correct.
     try:
-        check_msg = verify_chunk(chunk, zip_file_name, input_directory)
+        check_msg = verify_chunk(chunk, zip_file_name, input_directory, hard_links)
         with open(check_file_name, "w") as f:
             f.write(check_msg)
     except Exception as e:
@@ -511,22 +2186,28 @@ def compress_chunk(chunk: DirectoryTree, chunk_number: int, output_directory: st
         raise e
 
 
-def verify_chunk(chunk: DirectoryTree, zip_file_name: str, input_directory: str) -> str:
+def verify_chunk(
+    chunk: DirectoryTree, zip_file_name: str, input_directory: str, hard_links: Optional[Dict[str, str]] = None
+) -> str:
     check_output: str = ""
-    all_input_files: List[FileMetadata] = get_all_files(chunk)
+    if hard_links:
+        # Hard links are not in the zip file
+        n_input_files = sum(1 for f in iter_files(chunk) if f.absolute_path not in hard_links)
+    else:
+        n_input_files = count_files(chunk)
 
     with zipfile.ZipFile(zip_file_name, "r") as zip_file:
         all_files: List[zipfile.ZipInfo] = zip_file.filelist
 
         # Check that the number of files in the zip file is the same as the number of files in the input
-        if len(all_files) != len(all_input_files):
+        if len(all_files) != n_input_files:
             raise RuntimeError(
                 f"Number of files in zip file {zip_file_name} ({len(all_files)}) does not match number of"
-                f" files in input ({len(all_input_files)})."
+                f" files in input ({n_input_files})."
             )
 
         check_output += f"Found {len(all_files)} files in zip file.\n"
-        check_output += f"Found {len(all_input_files)} files in input chunk.\n\n"
+        check_output += f"Found {n_input_files} files in input chunk.\n\n"
 
         # Check total size is the same
         total_size = 0
@@ -548,8 +2229,10 @@ def verify_chunk(chunk: DirectoryTree, zip_file_name: str, input_directory: str)
 
         # Check that each file in the input is present in the zip file
         input_files_dict = {f.filename: f.file_size for f in all_files}
-        for file_in_input in all_input_files:
-            arcname = build_archive_path(input_directory, file_in_input.absolute_path)
+        for file_in_input in iter_files(chunk):
+            if hard_links and file_in_input.absolute_path in hard_links:
+                continue
+            arcname = get_archive_path(file_in_input, input_directory)
             if arcname not in input_files_dict:
                 raise RuntimeError(f"File {arcname} is not present in zip file {zip_file_name}.")
 
@@ -568,23 +2251,227 @@ def verify_chunk(chunk: DirectoryTree, zip_file_name: str, input_directory: str)
     return check_output
 
 
-def build_chunk_dictionary(chunks: List[DirectoryTree], input_directory: str) -> str:
+# Number of characters read at a time when copying a chunk listing into the chunk dictionary
+LISTING_READ_CHARS = 1024 * 1024
+
+
+def _copy_chunk_listing(f: TextIO, chunk: DirectoryTree, listing_file_name: str, line_prefix: str) -> bool:
     """
-    Produce a dictionary of all files in the chunks.
+    Copy the lines of a chunk listing written by compress_chunk to f, adding line_prefix to each. Returns False if the
+    listing doesn't have the expected header, in which case nothing is written.
+    """
+    # The header always ends with the input directory of the chunk
+    header_end = f"Running with input directory: {chunk.absolute_path}\n\n"
+    # Longer than any header, which is a box of fixed size followed by the time and input directory
+    max_header_chars = 64 * 1024 + len(header_end)
+    with open(listing_file_name, "r") as listing:
+        start = ""
+        index = -1
+        while index == -1 and len(start) < max_header_chars:
+            block = listing.read(LISTING_READ_CHARS)
+            if len(block) == 0:
+                break
+            start += block
+            index = start.find(header_end)
+        if index == -1:
+            return False
+
+        remainder = start[index + len(header_end):]
+        while True:
+            block = listing.read(LISTING_READ_CHARS)
+            remainder += block
+            lines = remainder.split("\n")
+            # The last line is incomplete until the next block has been read
+            remainder = lines.pop()
+            if len(lines) > 0:
+                f.write(line_prefix + ("\n" + line_prefix).join(lines) + "\n")
+            if len(block) == 0:
+                break
+
+        if len(remainder) > 0:
+            f.write(line_prefix + remainder)
+    return True
+
+
+def write_chunk_dictionary(
+    f: TextIO,
+    chunks: List[DirectoryTree],
+    input_directory: str,
+    hard_links: Optional[Dict[str, str]] = None,
+    chunk_directory: Optional[str] = None
+) -> None:
+    """
+    Write a dictionary of all files in the chunks to a file, one chunk at a time.
+
+    With the chunk directory, the listing of each chunk written by compress_chunk is copied rather than formatting it
+    again from the tree, so building the dictionary is mostly reading and writing text.
     """
-    chunk_dictionary: str = ""
     for idx, chunk in enumerate(chunks):
         line_prefix = f"Chunk {idx:07d}: "
-        _, chunk_listing = build_full_listing(chunk, input_directory=input_directory, line_prefix=line_prefix)
-        chunk_dictionary += chunk_listing
-        chunk_dictionary += "\n\n\n"
-    return chunk_dictionary
+        listing_file_name = os.path.join(chunk_directory, f"Chunk{idx:07d}Listing.txt") if chunk_directory else None
+        if listing_file_name is None or not os.path.exists(listing_file_name) or not _copy_chunk_listing(
+            f, chunk, listing_file_name, line_prefix
+        ):
+            write_full_listing(f, chunk, input_directory, line_prefix, hard_links, header="")
+        f.write("\n\n\n")
 
 
-def build_html_ui(directory_tree: DirectoryTree, input_directory: str) -> str:
+def build_chunk_dictionary(
+    chunks: List[DirectoryTree], input_directory: str, hard_links: Optional[Dict[str, str]] = None
+) -> str:
+    """
+    Produce a dictionary of all files in the chunks.
+    """
+    chunk_dictionary = io.StringIO()
+    write_chunk_dictionary(chunk_dictionary, chunks, input_directory, hard_links)
+    return chunk_dictionary.getvalue()
+
+
+class ChunkIndex:
+    """
+    Read only access to a ChunkIndex.bin file, which maps the archive path of every file to the number of the chunk
+    holding it. The file is memory mapped and searched in place, so a path is found in O(log n) without reading the
+    whole index.
+
+    The file holds, all little endian:
+        - MAGIC, then the number of files n as a uint64
+        - n + 1 uint64 offsets of the paths in the path data
+        - n int32 chunk numbers
+        - the path data: the UTF-8 archive paths, sorted by their bytes and not separated
+    """
+    MAGIC = b"ARCHIDX1"
+    FILE_NAME = "ChunkIndex.bin"
+    _HEADER = struct.Struct("<8sQ")
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < self._HEADER.size:
+                raise RuntimeError(f"{path} is not a chunk index.")
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._count = self._HEADER.unpack_from(self._data)
+        if magic != self.MAGIC:
+            self.close()
+            raise RuntimeError(f"{path} is not a chunk index.")
+
+        self._offsets_start = self._HEADER.size
+        self._chunks_start = self._offsets_start + 8 * (self._count + 1)
+        self._paths_start = self._chunks_start + 4 * self._count
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __enter__(self) -> "ChunkIndex":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _path(self, index: int) -> bytes:
+        start, stop = struct.unpack_from("<QQ", self._data, self._offsets_start + 8 * index)
+        return self._data[self._paths_start + start:self._paths_start + stop]
+
+    def _chunk(self, index: int) -> int:
+        return struct.unpack_from("<i", self._data, self._chunks_start + 4 * index)[0]
+
+    def _lower_bound(self, path: bytes) -> int:
+        # The index of the first path which is not less than path
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._path(middle) < path:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, archive_path: str) -> Optional[int]:
+        """
+        The number of the chunk holding a file, or None if it isn't in the index.
+        """
+        path = archive_path.encode("utf-8", "surrogateescape")
+        index = self._lower_bound(path)
+        if index < self._count and self._path(index) == path:
+            return self._chunk(index)
+        return None
+
+    def iter_directory(self, archive_path: str) -> Iterator[Tuple[str, int]]:
+        """
+        Iterate over the archive path and chunk number of every file within a directory, in order of their paths.
+        """
+        prefix = archive_path.rstrip("/").encode("utf-8", "surrogateescape") + b"/"
+        index = self._lower_bound(prefix)
+        while index < self._count:
+            path = self._path(index)
+            if not path.startswith(prefix):
+                break
+            yield path.decode("utf-8", "surrogateescape"), self._chunk(index)
+            index += 1
+
+    def directory_chunks(self, archive_path: str) -> List[int]:
+        """
+        The numbers of all chunks needed to restore a directory.
+        """
+        return sorted({chunk for _, chunk in self.iter_directory(archive_path)})
 
-    file_listing = build_react_chonky_json_listing(directory_tree, input_directory)
 
+def write_chunk_index(
+    path: str, chunks: List[DirectoryTree], input_directory: str, hard_links: Optional[Dict[str, str]] = None
+) -> None:
+    """
+    Write a ChunkIndex.bin file for the chunks, see ChunkIndex. Files which are hard links (keys of hard_links) are
+    indexed with the chunk holding the file archived in their place.
+    """
+    primaries = set(hard_links.values()) if hard_links else set()
+    primary_chunks: Dict[str, int] = {}
+    links: List[Tuple[bytes, str]] = []
+    entries: List[Tuple[bytes, int]] = []
+
+    for chunk_number, chunk in enumerate(chunks):
+        for f in iter_files(chunk):
+            archive_path = get_archive_path(f, input_directory).encode("utf-8", "surrogateescape")
+            if hard_links and f.absolute_path in hard_links:
+                links.append((archive_path, hard_links[f.absolute_path]))
+                continue
+            if f.absolute_path in primaries:
+                primary_chunks[f.absolute_path] = chunk_number
+            entries.append((archive_path, chunk_number))
+
+    entries.extend((archive_path, primary_chunks[primary]) for archive_path, primary in links)
+    entries.sort()
+
+    offsets = array("Q", [0])
+    chunk_numbers = array("i")
+    length = 0
+    for archive_path, chunk_number in entries:
+        length += len(archive_path)
+        offsets.append(length)
+        chunk_numbers.append(chunk_number)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+        chunk_numbers.byteswap()
+
+    with open(path, "wb") as index_file:
+        index_file.write(ChunkIndex._HEADER.pack(ChunkIndex.MAGIC, len(entries)))
+        index_file.write(offsets.tobytes())
+        index_file.write(chunk_numbers.tobytes())
+        for archive_path, _ in entries:
+            index_file.write(archive_path)
+
+
+# Placeholder for the file map in main.jsprebuild
+_FILE_MAP_PLACEHOLDER = '{"productionFileMapWillBeSwappedByPostProcessingScript":{"productionFileMapWillBeSwappedByPostProcessingScript":"productionFileMapWillBeSwappedByPostProcessingScript"}}'  # noqa: E501
+
+
+def get_html_ui_template(directory_tree: DirectoryTree) -> Tuple[str, str]:
+    """
+    Load the web interface for a directory tree, split where the JSON of its Chonky file map goes. Returns a tuple of
+    (html_before_file_map, html_after_file_map).
+    """
     html_raw = get_data("archiver.res", "index.htmlprebuild")
     if html_raw is None:
         raise RuntimeError("Could not find index.htmlprebuild in the resource file.")
@@ -600,23 +2487,72 @@ def build_html_ui(directory_tree: DirectoryTree, input_directory: str) -> str:
 
     html = html.replace("{{TITLE}}", "Archive: " + os.path.basename(os.path.normpath(directory_tree.path)))
 
-    substr = '{"productionFileMapWillBeSwappedByPostProcessingScript":{"productionFileMapWillBeSwappedByPostProcessingScript":"productionFileMapWillBeSwappedByPostProcessingScript"}}'  # noqa: E501
-    if substr not in main_js:
+    if main_js.count(_FILE_MAP_PLACEHOLDER) != 1:
         raise RuntimeError("Could not find substring to replace in main.jsprebuild.")
+    if html.count("{{MAIN_JS}}") != 1:
+        raise RuntimeError("Could not find {{MAIN_JS}} to replace in index.htmlprebuild.")
+
+    html_before_main_js, _, html_after_main_js = html.partition("{{MAIN_JS}}")
+    main_js_before_file_map, _, main_js_after_file_map = main_js.partition(_FILE_MAP_PLACEHOLDER)
+    return html_before_main_js + main_js_before_file_map, main_js_after_file_map + html_after_main_js
 
-    main_js = main_js.replace(substr, json.dumps(file_listing))
 
-    return html.replace("{{MAIN_JS}}", main_js)
+def build_html_ui(
+    directory_tree: DirectoryTree, input_directory: str, file_listing: Optional[Union[dict, str]] = None
+) -> str:
+    """
+    Build the self-contained web interface for a directory tree. The Chonky file map of the tree is built unless it is
+    given, either as built by build_react_chonky_json_listing or already serialised as JSON.
+
+    For large trees, write_html_ui writes the same web interface without holding it in memory.
+    """
+    if file_listing is None:
+        file_listing = build_react_chonky_json_listing(directory_tree, input_directory)
+    file_listing_json = file_listing if isinstance(file_listing, str) else json.dumps(file_listing)
+
+    html_before_file_map, html_after_file_map = get_html_ui_template(directory_tree)
+    return html_before_file_map + file_listing_json + html_after_file_map
+
+
+def write_html_ui(
+    f: TextIO, directory_tree: DirectoryTree, input_directory: str, file_listing: Optional[TextIO] = None
+) -> None:
+    """
+    Write the self-contained web interface for a directory tree to a file, streaming the JSON of the Chonky file map
+    into it rather than building the page in memory. With a file_listing, the JSON is copied from it (e.g.
+    WebFileListing.json as written by write_react_chonky_json_listing) rather than built from the tree again.
+    """
+    html_before_file_map, html_after_file_map = get_html_ui_template(directory_tree)
+    f.write(html_before_file_map)
+    if file_listing is None:
+        write_react_chonky_json_listing(f, directory_tree, input_directory)
+    else:
+        while True:
+            block = file_listing.read(LISTING_READ_CHARS)
+            if len(block) == 0:
+                break
+            f.write(block)
+    f.write(html_after_file_map)
 
 
 class ArchiveRunner:
 
     def __init__(self):
         self._chunker_settings = ChunkerSettings()
+        self._scanner_settings = ScannerSettings()
         self._input_directory: Optional[str] = None
         self._output_directory: Optional[str] = None
         self._upload = False
         self._verbose = False
+        self._scan_store_path: Optional[str] = None
+        self._compact_metadata = False
+        self._scan_cache_path: Optional[str] = None
+        self._exclude_patterns: List[str] = []
+        self._include_patterns: List[str] = []
+        self._dedupe_hard_links = False
+        self._listing_compression: Optional[str] = None
+        self._progress_printer: Optional[ProgressPrinter] = None
+        self._stage_seconds: Dict[str, float] = {}
 
     def parse_arguments(self, args: List[str]) -> None:
         """
@@ -626,7 +2562,13 @@ class ArchiveRunner:
 
         input-dir and output-dir are mandatory. Target chunk size is optional
         """
-        parser = argparse.ArgumentParser(description="Archive a directory into chunks of a given size.")
+        parser = argparse.ArgumentParser(
+            description="Archive a directory into chunks of a given size.",
+            epilog=(
+                f"To find which chunks of an archive hold a file or directory from its {ChunkIndex.FILE_NAME}, run"
+                " 'archiver locate /path/to/output path/in/archive' (see 'archiver locate --help')."
+            ),
+        )
         parser.add_argument("--input-dir", type=str, required=True, help="Path to the input directory.")
         parser.add_argument("--output-dir", type=str, required=True, help="Path to the output directory.")
         parser.add_argument("--version", action="version", version=f"Project Archiver {__version__}")
@@ -651,6 +2593,108 @@ class ArchiveRunner:
             help=f"Target size of each chunk in MB. Default is {default_chunk_size_mb} MB.",
         )
 
+        parser.add_argument(
+            "--scan-workers",
+            type=int,
+            default=1,
+            help=(
+                "Number of threads used to scan the input directory. Values above 1 help on network filesystems"
+                " where each listdir / stat call has a high latency. Default is 1."
+            ),
+        )
+
+        parser.add_argument(
+            "--scan-store",
+            type=str,
+            default=None,
+            help=(
+                "Path of an SQLite database to hold file metadata during the run, instead of holding it in memory."
+                " Use this for inputs with too many files to fit in RAM. The database must not exist already, and is"
+                " removed when the run finishes."
+            ),
+        )
+
+        parser.add_argument(
+            "--compact-metadata",
+            action="store_true",
+            default=False,
+            help=(
+                "Hold file metadata in a compact columnar table rather than one object per file. This uses a fraction"
+                " of the memory for inputs with many files."
+            ),
+        )
+
+        parser.add_argument(
+            "--scan-processes",
+            type=int,
+            default=1,
+            help=(
+                "Number of processes used to scan the input directory. Each top level sub directory is scanned in its"
+                " own process, which helps when building the metadata is limited by a single CPU core. Default is 1."
+            ),
+        )
+
+        parser.add_argument(
+            "--scan-cache",
+            type=str,
+            default=None,
+            help=(
+                "Path of a file to keep the scan of the input directory in between runs. Directories which haven't"
+                " changed since the previous run (going by their modification time) are not listed again. Files which"
+                " are rewritten in place don't change the modification time of their directory, so don't use the"
+                " cache if files may have been modified since the previous run."
+            ),
+        )
+
+        parser.add_argument(
+            "--exclude",
+            type=str,
+            action="append",
+            default=[],
+            metavar="PATTERN",
+            help=(
+                "Glob pattern of files and directories to leave out of the archive, e.g. '.git' or '*.tmp'. Patterns"
+                " without a '/' match names, others match paths relative to the input directory, and patterns ending"
+                " in '/' only match directories. As in .gitignore, '*' matches within a directory and '**' across"
+                " directories, e.g. 'data/**/*.tmp'. Excluded directories are not scanned. Can be given more than once."
+                f" Patterns are also read from {ScanFilter.IGNORE_FILE} in the input directory, if it exists."
+            ),
+        )
+
+        parser.add_argument(
+            "--include",
+            type=str,
+            action="append",
+            default=[],
+            metavar="PATTERN",
+            help=(
+                "Glob pattern of files and directories to keep even if they match an exclude pattern, e.g."
+                " --exclude '*.log' --include 'important.log'. Can be given more than once."
+            ),
+        )
+
+        parser.add_argument(
+            "--compress-listings",
+            type=str,
+            choices=list(LISTING_COMPRESSION_EXTENSIONS),
+            default=None,
+            help=(
+                "Compress FullListing.txt, ChunkDictionary.txt and WebFileListing.json as they are written, adding"
+                " .gz or .zst to their names. zstd uses a thread per CPU core, and needs the zstandard package."
+            ),
+        )
+
+        parser.add_argument(
+            "--dedupe-hard-links",
+            action="store_true",
+            default=False,
+            help=(
+                "Archive a file with several hard links in the input directory once, and list its other paths as"
+                " references to it. The chunk holding a link may then not hold the file itself, so extracting one"
+                " chunk no longer restores every file in its listing. By default every path is archived separately."
+            ),
+        )
+
         parsed_args = parser.parse_args(args)
 
         self._input_directory = parsed_args.input_dir
@@ -659,6 +2703,22 @@ class ArchiveRunner:
         self._verbose = parsed_args.verbose
         self._upload = parsed_args.upload
         self._html_only = parsed_args.html_only
+        self._scanner_settings.workers = parsed_args.scan_workers
+        self._scanner_settings.processes = parsed_args.scan_processes
+        self._scan_store_path = parsed_args.scan_store
+        self._compact_metadata = parsed_args.compact_metadata
+        self._scan_cache_path = parsed_args.scan_cache
+        self._exclude_patterns = parsed_args.exclude
+        self._include_patterns = parsed_args.include
+        self._dedupe_hard_links = parsed_args.dedupe_hard_links
+        self._listing_compression = parsed_args.compress_listings
+
+        if self._listing_compression == "zstd":
+            # Fail now if zstandard is missing, rather than once the chunks are written
+            _import_zstandard()
+
+        if self._compact_metadata and self._scan_store_path is not None:
+            raise RuntimeError("Cannot enable --compact-metadata and --scan-store together.")
 
         if self._html_only and self._upload:
             raise RuntimeError("Cannot enable --upload and output HTML only.")
@@ -666,6 +2726,12 @@ class ArchiveRunner:
         if self._chunker_settings.target_size_bytes < 1:
             raise ValueError("Target chunk size must be at least 1 B.")
 
+        if self._scanner_settings.workers < 1:
+            raise ValueError("Number of scan workers must be at least 1.")
+
+        if self._scanner_settings.processes < 1:
+            raise ValueError("Number of scan processes must be at least 1.")
+
     @staticmethod
     def _get_s3_bucket(boto_session_cls: Type[boto3.Session]):  # noqa
         access_key = os.environ.get("ARCHIVER_S3_ACCESS_KEY", "")
@@ -706,6 +2772,7 @@ class ArchiveRunner:
             self._get_s3_bucket(boto_session_cls)
 
         progress_printer = ProgressPrinter(self._verbose)
+        self._progress_printer = progress_printer
 
         assert type(self._input_directory) is str
         assert type(self._output_directory) is str
@@ -740,59 +2807,155 @@ class ArchiveRunner:
         if len(os.listdir(self._output_directory)) > 0:
             raise RuntimeError(f"Output directory {self._output_directory} is not empty.")
 
+        if self._scan_store_path is not None:
+            self._scanner_settings.store = ScanStore(self._scan_store_path)
+        self._scanner_settings.file_table = FileTable() if self._compact_metadata else None
+        self._scanner_settings.cache = ScanCache(self._scan_cache_path) if self._scan_cache_path is not None else None
+        scan_filter = ScanFilter.from_arguments(self._input_directory, self._exclude_patterns, self._include_patterns)
+        self._scanner_settings.scan_filter = scan_filter if len(scan_filter.rules) > 0 else None
+        self._scanner_settings.hard_links = HardLinkIndex() if self._dedupe_hard_links else None
+
+        try:
+            self._archive(progress_printer, boto_session_cls)
+        finally:
+            store = self._scanner_settings.store
+            if store is not None:
+                store.close()
+                os.remove(store.path)
+                self._scanner_settings.store = None
+
+    def get_progress(self) -> Optional[ProgressCounters]:
+        """
+        Counters of the scan in progress (or last run), e.g. for callers running the archiver in another thread.
+        """
+        if self._progress_printer is None:
+            return None
+        return self._progress_printer.get_counters()
+
+    def get_stage_seconds(self) -> Dict[str, float]:
+        """
+        Wall time of each stage of the last run, in the order they ran, e.g. {"scan": 1.5, "listing": 0.2, ...}.
+        """
+        return dict(self._stage_seconds)
+
+    def _listing_file_name(self, name: str) -> str:
+        """
+        Name of a listing output, with the extension of the listing compression if there is one.
+        """
+        if self._listing_compression is None:
+            return name
+        return name + LISTING_COMPRESSION_EXTENSIONS[self._listing_compression]
+
+    @contextmanager
+    def _stage(
+        self, name: str, progress_printer: ProgressPrinter, title: Optional[str] = None, total: int = 0
+    ) -> Iterator[Optional[Callable]]:
+        """
+        Time a stage of the run, showing a progress bar with the given title.
+        """
+        start_time = time.perf_counter()
+        try:
+            if title is None:
+                yield None
+            else:
+                with alive_bar(title_length=27, title=title, total=total) as bar:
+                    progress_printer.set_alive_bar(bar)
+                    yield bar
+        finally:
+            self._stage_seconds[name] = time.perf_counter() - start_time
+
+    def _archive(self, progress_printer: ProgressPrinter, boto_session_cls: Optional[Type[boto3.Session]]) -> None:
+        assert type(self._input_directory) is str
+        assert type(self._output_directory) is str
+        self._stage_seconds = {}
+
+        cache = self._scanner_settings.cache
+        if cache is not None:
+            # The previous scan gives the ETA of this one
+            expected_files, expected_size_bytes = cache.previous_totals()
+            if expected_files > 0:
+                progress_printer.start(expected_files, expected_size_bytes)
+
         # Create initial directory tree
-        with alive_bar(title_length=27, title="Scanning input dir", total=0) as bar:
-            progress_printer.set_alive_bar(bar)
-            input_tree = build_directory_tree(self._input_directory, progress_printer)
+        with self._stage("scan", progress_printer, "Scanning input dir"):
+            input_tree = build_directory_tree(self._input_directory, progress_printer, self._scanner_settings)
+
+        if cache is not None:
+            cache.save()
+            if self._verbose:
+                print(f"Scan cache: {cache.hits:,} directories unchanged, {cache.misses:,} directories listed")
+
+        hard_links: Dict[str, str] = {}
+        if self._scanner_settings.hard_links is not None:
+            hard_links = self._scanner_settings.hard_links.links
+            if len(hard_links) > 0:
+                print(
+                    f"Found {len(hard_links):,} hard links to files which are archived once, saving"
+                    f" {format_bytes(self._scanner_settings.hard_links.bytes_saved)}"
+                )
 
         if self._html_only:
             # Create the web interface
-            with alive_bar(title_length=27, title="Creating WebInterface.html", total=0) as bar:
-                progress_printer.set_alive_bar(bar)
+            with self._stage("web", progress_printer, "Creating WebInterface.html"):
                 with open(os.path.join(self._output_directory, "WebInterface.html"), "w") as f:
-                    f.write(build_html_ui(input_tree, self._input_directory))
+                    write_html_ui(f, input_tree, self._input_directory)
             return
 
-        header, content = build_full_listing(input_tree, self._input_directory)
+        with self._stage("listing", progress_printer):
+            header = build_listing_header(input_tree, get_listing_totals(input_tree, hard_links))
         print(f"\n{header}\n")
 
         # Create chunks
-        with alive_bar(title_length=27, title="Deciding on chunks", total=0) as bar:
-            progress_printer.set_alive_bar(bar)
-            chunks = divide_tree_into_chunks(input_tree, self._chunker_settings)
+        with self._stage("chunking", progress_printer, "Deciding on chunks"):
+            chunks = divide_tree_into_chunks(input_tree, self._chunker_settings, hard_links)
 
         # Save compressed chunks to disk
-        with alive_bar(title_length=27, title="Saving & verifying chunks", total=len(chunks)) as bar:
-            progress_printer.set_alive_bar(bar)
+        with self._stage("compress", progress_printer, "Saving & verifying chunks", len(chunks)) as bar:
+            assert bar is not None
             for idx, chunk in enumerate(chunks):
-                compress_chunk(chunk, idx, self._output_directory, self._input_directory)
+                compress_chunk(chunk, idx, self._output_directory, self._input_directory, hard_links)
                 bar(idx / len(chunks))
 
         # Create dictionary of all files in chunks
-        with alive_bar(title_length=27, title="Creating ChunkDictionary.txt", total=0) as bar:
-            progress_printer.set_alive_bar(bar)
-            chunk_dictionary = build_chunk_dictionary(chunks, self._input_directory)
-            with open(os.path.join(self._output_directory, "ChunkDictionary.txt"), "w") as f:
-                f.write(chunk_dictionary)
-
-        # Create the full listing
-        with alive_bar(title_length=27, title="Creating FullListing.txt", total=0) as bar:
-            progress_printer.set_alive_bar(bar)
-            with open(os.path.join(self._output_directory, "FullListing.txt"), "w") as f:
-                f.write(header)
-                f.write(content)
-
-        # Create the web page JSON listing
-        with alive_bar(title_length=27, title="Creating WebFileListing.json", total=0) as bar:
-            progress_printer.set_alive_bar(bar)
-            with open(os.path.join(self._output_directory, "WebFileListing.json"), "w") as f:
-                json.dump(build_react_chonky_json_listing(input_tree, self._input_directory), f)
-
-        # Create the web interface
-        with alive_bar(title_length=27, title="Creating WebInterface.html", total=0) as bar:
-            progress_printer.set_alive_bar(bar)
-            with open(os.path.join(self._output_directory, "WebInterface.html"), "w") as f:
-                f.write(build_html_ui(input_tree, self._input_directory))
+        with self._stage("dictionary", progress_printer, "Creating ChunkDictionary.txt"):
+            with open_listing_output(
+                os.path.join(self._output_directory, self._listing_file_name("ChunkDictionary.txt")),
+                self._listing_compression
+            ) as f:
+                write_chunk_dictionary(
+                    f, chunks, self._input_directory, hard_links, chunk_directory=self._output_directory + "/Chunks"
+                )
+
+        # Create the index of which chunk holds each file, for archiver locate
+        with self._stage("index", progress_printer, f"Creating {ChunkIndex.FILE_NAME}"):
+            write_chunk_index(
+                os.path.join(self._output_directory, ChunkIndex.FILE_NAME), chunks, self._input_directory, hard_links
+            )
+
+        # Create the full listing, and the manifest in the same walk of the tree
+        with self._stage("full_listing", progress_printer, f"Creating FullListing.txt & {Manifest.FILE_NAME}"):
+            manifest = Manifest(os.path.join(self._output_directory, Manifest.FILE_NAME))
+            try:
+                with open_listing_output(
+                    os.path.join(self._output_directory, self._listing_file_name("FullListing.txt")),
+                    self._listing_compression
+                ) as f:
+                    write_full_listing(
+                        f, input_tree, self._input_directory, hard_links=hard_links, header=header, manifest=manifest
+                    )
+                manifest.add_chunks(chunks, self._output_directory + "/Chunks")
+            finally:
+                manifest.close()
+
+        # Create the web page JSON listing, then the web interface, which embeds the same JSON copied from the listing
+        # rather than walking the tree again
+        with self._stage("web", progress_printer, "Creating web listing & UI"):
+            web_listing_path = os.path.join(self._output_directory, self._listing_file_name("WebFileListing.json"))
+            with open_listing_output(web_listing_path, self._listing_compression) as f:
+                write_react_chonky_json_listing(f, input_tree, self._input_directory)
+            with open_listing_input(web_listing_path, self._listing_compression) as file_listing:
+                with open(os.path.join(self._output_directory, "WebInterface.html"), "w") as f:
+                    write_html_ui(f, input_tree, self._input_directory, file_listing)
 
         # Upload data to S3-compatible storage
         if self._upload:
@@ -803,9 +2966,8 @@ class ArchiveRunner:
             input_dir_name = os.path.basename(os.path.normpath(self._input_directory))
             chunk_directory = self._output_directory + "/Chunks"
 
-            with alive_bar(title_length=27, title="Uploading data", total=len(chunks)) as bar:
-                progress_printer.set_alive_bar(bar)
-
+            with self._stage("upload", progress_printer, "Uploading data", len(chunks)) as bar:
+                assert bar is not None
                 for chunk_number, _ in enumerate(chunks):
                     bucket.upload_file(
                         os.path.join(chunk_directory, f"Chunk{chunk_number:07d}.zip"),
@@ -826,20 +2988,97 @@ class ArchiveRunner:
 
                     bar(idx / len(chunks))
 
-            # Upload the full listing and chunk dictionary
-            bucket.upload_file(
-                os.path.join(self._output_directory, "FullListing.txt"),
-                os.path.join(input_dir_name, "FullListing.txt")
-            )
-            bucket.upload_file(
-                os.path.join(self._output_directory, "ChunkDictionary.txt"),
-                os.path.join(input_dir_name, "ChunkDictionary.txt")
-            )
-            bucket.upload_file(
-                os.path.join(self._output_directory, "WebFileListing.json"),
-                os.path.join(input_dir_name, "WebFileListing.json")
-            )
-            bucket.upload_file(
-                os.path.join(self._output_directory, "WebInterface.html"),
-                os.path.join(input_dir_name, "WebInterface.html")
+                # Upload the full listing and chunk dictionary
+                bucket.upload_file(
+                    os.path.join(self._output_directory, self._listing_file_name("FullListing.txt")),
+                    os.path.join(input_dir_name, self._listing_file_name("FullListing.txt"))
+                )
+                bucket.upload_file(
+                    os.path.join(self._output_directory, self._listing_file_name("ChunkDictionary.txt")),
+                    os.path.join(input_dir_name, self._listing_file_name("ChunkDictionary.txt"))
+                )
+                bucket.upload_file(
+                    os.path.join(self._output_directory, ChunkIndex.FILE_NAME),
+                    os.path.join(input_dir_name, ChunkIndex.FILE_NAME)
+                )
+                bucket.upload_file(
+                    os.path.join(self._output_directory, Manifest.FILE_NAME),
+                    os.path.join(input_dir_name, Manifest.FILE_NAME)
+                )
+                bucket.upload_file(
+                    os.path.join(self._output_directory, self._listing_file_name("WebFileListing.json")),
+                    os.path.join(input_dir_name, self._listing_file_name("WebFileListing.json"))
+                )
+                bucket.upload_file(
+                    os.path.join(self._output_directory, "WebInterface.html"),
+                    os.path.join(input_dir_name, "WebInterface.html")
+                )
+
+
+class LocateRunner:
+    """
+    Find which chunks of an archive hold a file, or the files of a directory, using its ChunkIndex.bin:
+
+    ./archiver locate /path/to/output myProject/data/file.txt
+    """
+    def __init__(self) -> None:
+        self._archive_directory: Optional[str] = None
+        self._archive_path: Optional[str] = None
+        self._chunks_only = False
+
+    def parse_arguments(self, args: List[str]) -> None:
+        parser = argparse.ArgumentParser(
+            prog="archiver locate", description="Find which chunks of an archive hold a file or directory."
+        )
+        parser.add_argument(
+            "archive_dir", type=str, help=f"Output directory of the archive, holding {ChunkIndex.FILE_NAME}."
+        )
+        parser.add_argument(
+            "path",
+            type=str,
+            help=(
+                "Archive path of a file or directory, as shown in FullListing.txt (starting with the name of the input"
+                " directory). For a directory, every file within it is listed."
             )
+        )
+        parser.add_argument(
+            "--chunks",
+            action="store_true",
+            default=False,
+            help="Only list the chunks needed, rather than each file and its chunk.",
+        )
+
+        parsed_args = parser.parse_args(args)
+
+        self._archive_directory = parsed_args.archive_dir
+        self._archive_path = parsed_args.path
+        self._chunks_only = parsed_args.chunks
+
+    def run(self) -> None:
+        assert type(self._archive_directory) is str
+        assert type(self._archive_path) is str
+
+        index_path = os.path.join(self._archive_directory, ChunkIndex.FILE_NAME)
+        if not os.path.exists(index_path):
+            raise RuntimeError(f"Chunk index {index_path} does not exist.")
+
+        with ChunkIndex(index_path) as index:
+            chunk_number = index.find(self._archive_path)
+            files: Iterator[Tuple[str, int]]
+            if chunk_number is not None:
+                files = iter([(self._archive_path, chunk_number)])
+            else:
+                files = index.iter_directory(self._archive_path)
+
+            found = False
+            if self._chunks_only:
+                for chunk_number in sorted({chunk_number for _, chunk_number in files}):
+                    print(f"Chunk{chunk_number:07d}.zip")
+                    found = True
+            else:
+                for archive_path, chunk_number in files:
+                    print(f"Chunk{chunk_number:07d}.zip {archive_path}")
+                    found = True
+
+        if not found:
+            raise RuntimeError(f"{self._archive_path} is not in the archive.")
@@ -1,9 +1,15 @@
 import sys
 
-from archiver.archiver import ArchiveRunner
+from archiver.archiver import ArchiveRunner, LocateRunner
 
 
 def cli() -> int:
+    if sys.argv[1:2] == ["locate"]:
+        locate_runner = LocateRunner()
+        locate_runner.parse_arguments(sys.argv[2:])
+        locate_runner.run()
+        return 0
+
     runner = ArchiveRunner()
     runner.parse_arguments(sys.argv[1:])
     runner.run()
@@ -0,0 +1,76 @@
+"""
+Time of the listing and verify stages on an in-memory tree of 1e6 files, with the archive paths worked out once at
+scan time (set_archive_directories) and, for comparison, built from each file's absolute path as it is written.
+
+    python -m benchmarks.archive_paths --files 1000000 --files-per-directory 100
+
+The tree is never written to disk: the zip file verified holds an empty entry per file, and the files are zero bytes.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from archiver.archiver import (
+    DirectoryTree, FileMetadata, build_archive_path, set_archive_directories, verify_chunk, write_full_listing
+)
+
+
+def make_tree(input_directory: str, n_files: int, files_per_directory: int) -> DirectoryTree:
+    """
+    A root directory with n_files / files_per_directory sub directories, each holding files_per_directory files.
+    """
+    directories = []
+    for i in range(0, n_files, files_per_directory):
+        path = os.path.join(input_directory, f"folder_{i // files_per_directory}")
+        files = [
+            FileMetadata(path=f"file_{j}.dat", absolute_path=os.path.join(path, f"file_{j}.dat"), size=0,
+                         last_modified=0.0)
+            for j in range(min(files_per_directory, n_files - i))
+        ]
+        directories.append(DirectoryTree(files, 0, [], path, path, 0.0))
+    return DirectoryTree([], 0, directories, input_directory, input_directory, 0.0)
+
+
+def time_stages(tree: DirectoryTree, input_directory: str, zip_file_name: str) -> str:
+    with open(os.devnull, "w") as f:
+        start = time.perf_counter()
+        write_full_listing(f, tree, input_directory)
+        listing_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    verify_chunk(tree, zip_file_name, input_directory)
+    verify_seconds = time.perf_counter() - start
+    return f"{listing_seconds:>10.3f} {verify_seconds:>10.3f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1000000)
+    parser.add_argument("--files-per-directory", type=int, default=100)
+    args = parser.parse_args()
+
+    input_directory = "/benchmark/project"
+    tree = make_tree(input_directory, args.files, args.files_per_directory)
+
+    root = tempfile.mkdtemp()
+    try:
+        zip_file_name = os.path.join(root, "Chunk.zip")
+        with zipfile.ZipFile(zip_file_name, "w", zipfile.ZIP_STORED) as zip_file:
+            for sub_tree in tree.directories:
+                for f in sub_tree.files:
+                    zip_file.writestr(build_archive_path(input_directory, f.absolute_path), b"")
+
+        print(f"{args.files:,} files")
+        print(f"{'archive paths':<14} {'listing s':>10} {'verify s':>10}")
+        print(f"{'per file':<14} {time_stages(tree, input_directory, zip_file_name)}")
+        set_archive_directories(tree, input_directory)
+        print(f"{'at scan':<14} {time_stages(tree, input_directory, zip_file_name)}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Time every stage of ArchiveRunner.run on a reproducible synthetic tree, uploading to a local S3 stub, and write the
+timings to a JSON report so they can be compared between releases.
+
+    python -m benchmarks.end_to_end --files 100000 --depth 4 --fan-out 6 --report report.json
+    python -m benchmarks.end_to_end --files 100000 --archiver-args "--compact-metadata --scan-workers 8"
+
+Verification happens within the compress stage (compress_chunk calls verify_chunk), so it is timed separately and
+taken off the compress time.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shlex
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+from unittest.mock import patch
+
+import archiver.archiver
+from archiver.archiver import ArchiveRunner
+from archiver.version import __version__
+from benchmarks.s3_stub import LocalS3Session
+from benchmarks.synthetic import SyntheticTreeSpec, generate_tree
+
+
+def run_benchmark(root: str, spec: SyntheticTreeSpec, archiver_args: str, upload: bool) -> Dict[str, Any]:
+    input_dir = os.path.join(root, "project")
+    output_dir = os.path.join(root, "archive")
+    bucket_dir = os.path.join(root, "s3")
+
+    start_time = time.perf_counter()
+    tree = generate_tree(input_dir, spec)
+    generate_seconds = time.perf_counter() - start_time
+    os.mkdir(output_dir)
+
+    os.environ["ARCHIVER_S3_ACCESS_KEY"] = "benchmark"
+    os.environ["ARCHIVER_S3_SECRET_KEY"] = "benchmark"  # noqa: S105
+    os.environ["ARCHIVER_S3_BUCKET_NAME"] = "bucket"
+    os.environ["ARCHIVER_S3_ENDPOINT_URL"] = bucket_dir
+
+    runner = ArchiveRunner()
+    runner.parse_arguments(
+        ["--input-dir", input_dir, "--output-dir", output_dir]
+        + (["--upload"] if upload else [])
+        + shlex.split(archiver_args)
+    )
+
+    verify_seconds = 0.0
+    verify_chunk = archiver.archiver.verify_chunk
+
+    def _timed_verify_chunk(*args: Any, **kwargs: Any) -> str:
+        nonlocal verify_seconds
+        verify_start_time = time.perf_counter()
+        try:
+            return verify_chunk(*args, **kwargs)
+        finally:
+            verify_seconds += time.perf_counter() - verify_start_time
+
+    start_time = time.perf_counter()
+    with patch("archiver.archiver.verify_chunk", _timed_verify_chunk):
+        runner.run(boto_session_cls=LocalS3Session)
+    total_seconds = time.perf_counter() - start_time
+
+    stages = runner.get_stage_seconds()
+    stages["compress"] -= verify_seconds
+    stages["verify"] = verify_seconds
+    n_chunks = len([name for name in os.listdir(os.path.join(output_dir, "Chunks")) if name.endswith(".zip")])
+
+    return {
+        "archiver_version": __version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "archiver_args": archiver_args,
+        "tree": tree.to_dict(),
+        "generate_seconds": generate_seconds,
+        "chunks": n_chunks,
+        "stages_seconds": stages,
+        "total_seconds": total_seconds,
+        "files_per_second": tree.n_files / total_seconds,
+        "bytes_per_second": tree.size_bytes / total_seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = SyntheticTreeSpec()
+    parser.add_argument("--files", type=int, default=defaults.n_files)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--fan-out", type=int, default=defaults.fan_out)
+    parser.add_argument(
+        "--size-distribution", choices=["fixed", "uniform", "lognormal"], default=defaults.size_distribution
+    )
+    parser.add_argument("--mean-file-size", type=int, default=defaults.mean_file_size)
+    parser.add_argument("--compressibility", type=float, default=defaults.compressibility)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--archiver-args", type=str, default="", help="Extra arguments for the archiver")
+    parser.add_argument("--no-upload", action="store_true", default=False)
+    parser.add_argument("--work-dir", type=str, default=None, help="Where to create the tree (default: a temp dir)")
+    parser.add_argument("--report", type=str, default="benchmark_report.json")
+    args = parser.parse_args()
+
+    spec = SyntheticTreeSpec(
+        n_files=args.files,
+        depth=args.depth,
+        fan_out=args.fan_out,
+        size_distribution=args.size_distribution,
+        mean_file_size=args.mean_file_size,
+        compressibility=args.compressibility,
+        seed=args.seed
+    )
+
+    root = tempfile.mkdtemp(dir=args.work_dir)
+    try:
+        report = run_benchmark(root, spec, args.archiver_args, not args.no_upload)
+    finally:
+        shutil.rmtree(root)
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{report['tree']['files']:,} files, {report['chunks']:,} chunks, {report['total_seconds']:.2f} s")
+    for stage, seconds in report["stages_seconds"].items():
+        print(f"{stage:<14} {seconds:>10.3f} s")
+    print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Peak RSS of writing WebFileListing.json for an in-memory tree of 1e6 files, by building the Chonky file map and
+calling json.dump, compared with streaming it with write_react_chonky_json_listing. Likewise for WebInterface.html,
+built as a string by build_html_ui or streamed by write_html_ui. Each case runs in a fresh interpreter so the peaks
+are independent, and the RSS of the tree itself is shown for reference.
+
+    python -m benchmarks.json_memory --files 1000000 --files-per-directory 100
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess  # noqa
+import sys
+import time
+
+from archiver.archiver import (
+    build_html_ui, build_react_chonky_json_listing, write_html_ui, write_react_chonky_json_listing
+)
+from benchmarks.archive_paths import make_tree
+
+
+MODES = ["dump", "stream", "html", "html_stream"]
+
+
+def _child(mode: str, n_files: int, files_per_directory: int) -> None:
+    input_directory = "/benchmark/project"
+    tree = make_tree(input_directory, n_files, files_per_directory)
+    tree_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as f:
+        if mode == "dump":
+            json.dump(build_react_chonky_json_listing(tree, input_directory), f)
+        elif mode == "stream":
+            write_react_chonky_json_listing(f, tree, input_directory)
+        elif mode == "html":
+            f.write(build_html_ui(tree, input_directory))
+        else:
+            write_html_ui(f, tree, input_directory)
+    seconds = time.perf_counter() - start
+
+    print(tree_rss, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, seconds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1000000)
+    parser.add_argument("--files-per-directory", type=int, default=100)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.files, args.files_per_directory)
+        return
+
+    print(f"In-memory tree with {args.files:,} files")
+    print(f"{'mode':<12} {'tree MB':>10} {'peak MB':>10} {'seconds':>10}")
+    for mode in MODES:
+        output = subprocess.run(  # noqa
+            [
+                sys.executable, "-m", "benchmarks.json_memory", "--child", mode, "--files", str(args.files),
+                "--files-per-directory", str(args.files_per_directory)
+            ],
+            stdout=subprocess.PIPE,
+            check=True
+        ).stdout.decode("utf-8")
+        tree_rss, peak_rss, seconds = output.strip().splitlines()[-1].split()
+        print(f"{mode:<12} {int(tree_rss) / 1024:>10,.1f} {int(peak_rss) / 1024:>10,.1f} {float(seconds):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+A local stand-in for the parts of boto3 used by ArchiveRunner, which copies uploads into a directory. Pass
+LocalS3Session as the boto_session_cls of ArchiveRunner.run, with ARCHIVER_S3_ENDPOINT_URL set to the directory.
+"""
+import os
+import shutil
+from typing import List
+
+
+class LocalS3Object:
+    def __init__(self, key: str):
+        self.key = key
+
+
+class LocalS3Objects:
+    def __init__(self, root: str):
+        self._root = root
+
+    def all(self) -> List[LocalS3Object]:
+        objects = []
+        for directory, _, files in os.walk(self._root):
+            for name in files:
+                key = os.path.relpath(os.path.join(directory, name), self._root)
+                objects.append(LocalS3Object(key.replace(os.sep, "/")))
+        return objects
+
+
+class LocalS3Bucket:
+    def __init__(self, root: str):
+        self._root = root
+        self.objects = LocalS3Objects(root)
+
+    def upload_file(self, filename: str, key: str) -> None:
+        destination = os.path.join(self._root, key)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(filename, destination)
+
+
+class LocalS3Resource:
+    def __init__(self, service_name: str, endpoint_url: str):
+        self._endpoint_url = endpoint_url
+
+    def Bucket(self, name: str) -> LocalS3Bucket:  # noqa: N802
+        return LocalS3Bucket(os.path.join(self._endpoint_url, name))
+
+
+class LocalS3Session:
+    def __init__(self, aws_access_key_id: str, aws_secret_access_key: str):
+        pass
+
+    def resource(self, service_name: str, endpoint_url: str) -> LocalS3Resource:
+        return LocalS3Resource(service_name, endpoint_url)
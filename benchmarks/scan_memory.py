@@ -0,0 +1,85 @@
+"""
+Peak RSS of scanning, chunking and listing a synthetic tree with the file metadata held as FileMetadata objects,
+compared with a compact FileTable and with spilling it to a ScanStore. Each case runs in a fresh interpreter so the
+peaks are independent.
+
+    python -m benchmarks.scan_memory --fan-out 10 --depth 3 --files-per-directory 200
+"""
+import argparse
+import os
+import resource
+import shutil
+import subprocess  # noqa
+import sys
+import tempfile
+
+from archiver.archiver import (
+    ChunkerSettings,
+    FileTable,
+    ScannerSettings,
+    ScanStore,
+    build_directory_tree,
+    divide_tree_into_chunks,
+)
+from benchmarks.synthetic import make_tree
+
+
+def _child(mode: str, input_dir: str, store_path: str) -> None:
+    settings = ScannerSettings()
+    if mode == "store":
+        settings.store = ScanStore(store_path)
+    elif mode == "compact":
+        settings.file_table = FileTable()
+
+    tree = build_directory_tree(input_dir, scanner_settings=settings)
+    chunker_settings = ChunkerSettings()
+    chunker_settings.target_size_bytes = 1024 * 1024
+    divide_tree_into_chunks(tree, chunker_settings)
+    # Read every file back, as the listing writers do, without keeping the result
+    stack = [tree]
+    while stack:
+        directory = stack.pop()
+        for _ in directory.files:
+            pass
+        stack.extend(directory.directories)
+
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fan-out", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--files-per-directory", type=int, default=200)
+    parser.add_argument("--child", choices=["memory", "compact", "store"], help=argparse.SUPPRESS)
+    parser.add_argument("--input-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--store-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.input_dir, args.store_path)
+        return
+
+    root = tempfile.mkdtemp()
+    try:
+        input_dir = os.path.join(root, "input")
+        n_files = make_tree(
+            input_dir, fan_out=args.fan_out, depth=args.depth, files_per_directory=args.files_per_directory
+        )
+        print(f"Synthetic tree with {n_files:,} files")
+        for mode in ("memory", "compact", "store"):
+            output = subprocess.run(  # noqa
+                [
+                    sys.executable, "-m", "benchmarks.scan_memory", "--child", mode, "--input-dir", input_dir,
+                    "--store-path", os.path.join(root, f"{mode}.sqlite")
+                ],
+                stdout=subprocess.PIPE,
+                check=True
+            ).stdout.decode("utf-8")
+            print(f"{mode:<8} peak RSS: {int(output.strip().splitlines()[-1]) / 1024:,.1f} MB")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Wall time of scanning a synthetic tree with 1, 2, 4, ... processes up to the number of CPU cores, with and without
+compact metadata. Each top level sub directory is scanned in its own process, so use a fan out of at least the number
+of cores.
+
+    python -m benchmarks.scan_processes --fan-out 16 --depth 3 --files-per-directory 200
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import List
+
+from archiver.archiver import FileTable, ScannerSettings, build_directory_tree, count_files
+from benchmarks.synthetic import make_tree
+
+
+def process_counts(max_processes: int) -> List[int]:
+    counts = [1]
+    while counts[-1] * 2 < max_processes:
+        counts.append(counts[-1] * 2)
+    if max_processes > 1:
+        counts.append(max_processes)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fan-out", type=int, default=16)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--files-per-directory", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1, help="Scan threads in each process")
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        n_files = make_tree(root, fan_out=args.fan_out, depth=args.depth, files_per_directory=args.files_per_directory)
+        print(f"Synthetic tree with {n_files:,} files, {args.fan_out} top level directories")
+        print(f"{'processes':>9} {'memory s':>10} {'compact s':>10} {'speed up':>9}")
+
+        baseline = None
+        for processes in process_counts(args.max_processes):
+            times = []
+            for compact in (False, True):
+                best = float("inf")
+                for _ in range(args.repeat):
+                    settings = ScannerSettings(
+                        workers=args.workers, processes=processes, file_table=FileTable() if compact else None
+                    )
+                    start = time.perf_counter()
+                    tree = build_directory_tree(root, scanner_settings=settings)
+                    best = min(best, time.perf_counter() - start)
+                    assert count_files(tree) == n_files
+                times.append(best)
+
+            if baseline is None:
+                baseline = times[0]
+            print(f"{processes:>9} {times[0]:>10.3f} {times[1]:>10.3f} {baseline / times[0]:>8.2f}x")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compare the number of filesystem calls made by the os.scandir based scanner against the previous
+listdir / isfile / isdir / stat implementation.
+
+    python -m benchmarks.scan_syscalls --fan-out 4 --depth 4 --files-per-directory 20
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, Iterator, List
+
+from archiver.archiver import (
+    DirectoryTree,
+    build_directory_tree,
+    list_all_directories,
+    list_all_files,
+)
+from benchmarks.synthetic import make_tree
+
+
+def legacy_build_directory_tree(path: str) -> DirectoryTree:
+    """
+    The directory walk as it was before scan_directory: two listdir calls per directory, an isfile / isdir call per
+    entry, a stat per match and a final stat of the directory itself.
+    """
+    files = list_all_files(path)
+    directories = list_all_directories(path)
+    sub_trees = [legacy_build_directory_tree(d.absolute_path) for d in directories]
+    sub_trees.sort(key=lambda t: t.total_size_bytes)
+    return DirectoryTree(
+        files=files,
+        total_size_bytes=sum(f.size for f in files) + sum(t.total_size_bytes for t in sub_trees),
+        directories=sub_trees,
+        path=path,
+        absolute_path=os.path.abspath(path),
+        last_modified=os.stat(os.path.abspath(path)).st_mtime
+    )
+
+
+class _CountingDirEntry:
+    """
+    Wraps an os.DirEntry, counting the stat() calls which hit the filesystem (the first one, after that it is cached).
+    """
+    def __init__(self, entry: os.DirEntry, counts: Dict[str, int]):
+        self._entry = entry
+        self._counts = counts
+        self._stat_cached = False
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_file(self) -> bool:
+        return self._entry.is_file()
+
+    def is_dir(self) -> bool:
+        return self._entry.is_dir()
+
+    def stat(self) -> os.stat_result:
+        if not self._stat_cached:
+            self._counts["stat"] += 1
+            self._stat_cached = True
+        return self._entry.stat()
+
+
+class _CountingScandir:
+    def __init__(self, scandir_iterator: Any, counts: Dict[str, int]):
+        self._iterator = scandir_iterator
+        self._counts = counts
+
+    def __enter__(self) -> "_CountingScandir":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self._iterator.close()
+
+    def __iter__(self) -> Iterator[_CountingDirEntry]:
+        for entry in self._iterator:
+            yield _CountingDirEntry(entry, self._counts)
+
+
+@contextmanager
+def count_syscalls() -> Generator[Dict[str, int], None, None]:
+    """
+    Patch the os module so that directory reads and stat calls are counted. os.path.isfile / isdir call os.stat
+    internally, so they are counted as stat calls.
+    """
+    counts = {"readdir": 0, "stat": 0}
+    original_listdir, original_scandir, original_stat = os.listdir, os.scandir, os.stat
+
+    def _listdir(path: str) -> List[str]:
+        counts["readdir"] += 1
+        return original_listdir(path)
+
+    def _scandir(path: str) -> _CountingScandir:
+        counts["readdir"] += 1
+        return _CountingScandir(original_scandir(path), counts)
+
+    def _stat(path: str, *args: Any, **kwargs: Any) -> os.stat_result:
+        counts["stat"] += 1
+        return original_stat(path, *args, **kwargs)
+
+    os.listdir, os.scandir, os.stat = _listdir, _scandir, _stat  # type: ignore
+    try:
+        yield counts
+    finally:
+        os.listdir, os.scandir, os.stat = original_listdir, original_scandir, original_stat  # type: ignore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fan-out", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--files-per-directory", type=int, default=20)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        n_files = make_tree(
+            os.path.join(root, "input"), fan_out=args.fan_out, depth=args.depth,
+            files_per_directory=args.files_per_directory
+        )
+        input_dir = os.path.join(root, "input")
+        print(f"Synthetic tree with {n_files:,} files")
+        print(f"{'implementation':<16} {'readdir':>10} {'stat':>10} {'seconds':>10}")
+
+        for name, walk in (("legacy", legacy_build_directory_tree), ("scandir", build_directory_tree)):
+            with count_syscalls() as counts:
+                start = time.perf_counter()
+                walk(input_dir)
+                elapsed = time.perf_counter() - start
+            print(f"{name:<16} {counts['readdir']:>10,} {counts['stat']:>10,} {elapsed:>10.3f}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import math
+import os
+import random
+from dataclasses import asdict, dataclass
+from typing import List
+
+
+def make_tree(root: str, fan_out: int = 4, depth: int = 3, files_per_directory: int = 10, file_size: int = 16) -> int:
+    """
+    Create a synthetic directory tree under root. Every directory contains files_per_directory files of file_size bytes
+    and, down to the given depth, fan_out sub directories.
+
+    Returns the number of files created.
+    """
+    n_files = 0
+    stack = [(root, 0)]
+    os.makedirs(root, exist_ok=True)
+
+    while stack:
+        directory, level = stack.pop()
+        for i in range(files_per_directory):
+            with open(os.path.join(directory, f"file_{i}.dat"), "wb") as f:
+                f.write(b"-" * file_size)
+            n_files += 1
+
+        if level < depth:
+            for i in range(fan_out):
+                sub_directory = os.path.join(directory, f"folder_{i}")
+                os.mkdir(sub_directory)
+                stack.append((sub_directory, level + 1))
+
+    return n_files
+
+
+@dataclass
+class SyntheticTreeSpec:
+    n_files: int = 10000
+    depth: int = 3
+    fan_out: int = 4
+    # "fixed", "uniform" (0 to twice the mean) or "lognormal"
+    size_distribution: str = "lognormal"
+    mean_file_size: int = 16 * 1024
+    # Fraction of each file which is zeros rather than random bytes, so roughly how much deflate can remove
+    compressibility: float = 0.5
+    seed: int = 0
+
+
+@dataclass
+class SyntheticTree:
+    spec: SyntheticTreeSpec
+    n_files: int
+    n_directories: int
+    size_bytes: int
+
+    def to_dict(self) -> dict:
+        return {**asdict(self.spec), "files": self.n_files, "directories": self.n_directories, "bytes": self.size_bytes}
+
+
+# Random bytes are sliced from a pool, as generating them per file would dominate the time taken
+_RANDOM_POOL_BYTES = 4 * 1024 * 1024
+
+
+def _file_sizes(spec: SyntheticTreeSpec, rng: random.Random) -> List[int]:
+    if spec.size_distribution == "fixed":
+        return [spec.mean_file_size] * spec.n_files
+    if spec.size_distribution == "uniform":
+        return [rng.randint(0, 2 * spec.mean_file_size) for _ in range(spec.n_files)]
+    if spec.size_distribution == "lognormal":
+        # A heavy tail of large files, as seen in real projects. mu is chosen so that the mean is mean_file_size.
+        sigma = 1.5
+        mu = math.log(max(spec.mean_file_size, 1)) - sigma ** 2 / 2
+        return [int(rng.lognormvariate(mu, sigma)) for _ in range(spec.n_files)]
+    raise ValueError(f"Unknown size distribution {spec.size_distribution}.")
+
+
+def generate_tree(root: str, spec: SyntheticTreeSpec) -> SyntheticTree:
+    """
+    Create a reproducible synthetic tree under root: a full tree of fan_out sub directories per level down to depth,
+    with spec.n_files files spread evenly over the directories.
+
+    The random part of each file is written first, and the zeros after it are made by extending the file, so they are
+    sparse on filesystems which support it and the tree takes up less disk space than its size.
+    """
+    if not 0 <= spec.compressibility <= 1:
+        raise ValueError("Compressibility must be between 0 and 1.")
+
+    rng = random.Random(spec.seed)
+    pool = rng.getrandbits(8 * _RANDOM_POOL_BYTES).to_bytes(_RANDOM_POOL_BYTES, "little")
+    sizes = _file_sizes(spec, rng)
+
+    directories = []
+    stack = [(root, 0)]
+    os.makedirs(root, exist_ok=True)
+    while stack:
+        directory, level = stack.pop()
+        directories.append(directory)
+        if level < spec.depth:
+            for i in range(spec.fan_out):
+                sub_directory = os.path.join(directory, f"folder_{i}")
+                os.mkdir(sub_directory)
+                stack.append((sub_directory, level + 1))
+
+    for index, size in enumerate(sizes):
+        directory = directories[index % len(directories)]
+        random_bytes = int(size * (1 - spec.compressibility))
+        with open(os.path.join(directory, f"file_{index}.dat"), "wb") as f:
+            written = 0
+            while written < random_bytes:
+                start = rng.randrange(_RANDOM_POOL_BYTES)
+                block = pool[start:start + random_bytes - written]
+                f.write(block)
+                written += len(block)
+            f.truncate(size)
+
+    return SyntheticTree(spec=spec, n_files=len(sizes), n_directories=len(directories), size_bytes=sum(sizes))
@@ -0,0 +1,203 @@
+"""
+Per-node cost of walking deep and wide in-memory directory trees, comparing the recursive walks used before
+against the explicit-stack walks in archiver.archiver.
+
+    python -m benchmarks.traversal --depth 900 --width 100000
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from archiver.archiver import (
+    ChunkerSettings,
+    DirectoryTree,
+    FileMetadata,
+    build_archive_path,
+    build_full_listing,
+    build_react_chonky_json_listing,
+    divide_tree_into_chunks,
+    format_bytes,
+    format_last_modified_time,
+    format_last_modified_time_as_iso,
+    get_all_directories,
+)
+
+
+def deep_tree(depth: int) -> DirectoryTree:
+    """
+    A chain of depth directories, each holding one file.
+    """
+    tree: Optional[DirectoryTree] = None
+    for level in reversed(range(depth)):
+        path = "root" + "/d" * level
+        tree = DirectoryTree(
+            files=[FileMetadata(path="f", absolute_path=path + "/f", size=1, last_modified=0.0)],
+            total_size_bytes=depth - level,
+            directories=[tree] if tree is not None else [],
+            path=path,
+            absolute_path=path,
+            last_modified=0.0
+        )
+    assert tree is not None
+    return tree
+
+
+def wide_tree(width: int) -> DirectoryTree:
+    """
+    A root directory with width sub directories, each holding one file.
+    """
+    directories = [
+        DirectoryTree(
+            files=[FileMetadata(path="f", absolute_path=f"root/d{i}/f", size=1, last_modified=0.0)],
+            total_size_bytes=1,
+            directories=[],
+            path=f"root/d{i}",
+            absolute_path=f"root/d{i}",
+            last_modified=0.0
+        )
+        for i in range(width)
+    ]
+    return DirectoryTree(
+        files=[], total_size_bytes=width, directories=directories, path="root", absolute_path="root", last_modified=0.0
+    )
+
+
+def recursive_get_all_directories(directory_tree: DirectoryTree) -> List[str]:
+    directories = [directory_tree.absolute_path]
+    for sub_tree in directory_tree.directories:
+        directories += recursive_get_all_directories(sub_tree)
+    return directories
+
+
+def recursive_full_listing(directory_tree: DirectoryTree, input_directory: str) -> str:
+    full_listing = ""
+
+    def _recurse(directory_tree: DirectoryTree) -> None:
+        nonlocal full_listing
+        for f in directory_tree.files:
+            date_str = format_last_modified_time(f.last_modified)
+            archive_path = build_archive_path(input_directory, f.absolute_path)
+            full_listing += f"{date_str} {format_bytes(f.size).ljust(10)} {archive_path}  {f.size}\n"
+        for d in directory_tree.directories:
+            _recurse(d)
+
+    _recurse(directory_tree)
+    return full_listing
+
+
+def recursive_chonky_listing(directory_tree: DirectoryTree, input_directory: str) -> dict:
+    current_obj_id = 0
+    file_map: dict = {}
+
+    def _build_name(path: str) -> str:
+        return os.path.basename(os.path.normpath(build_archive_path(input_directory, path)))
+
+    def _recurse(directory_tree: DirectoryTree, parent_id: str = "") -> None:
+        nonlocal current_obj_id
+
+        this_dir_id = str(current_obj_id)
+        this_dir_child_ids = []
+
+        present_in_chunks = []
+        if directory_tree.present_in_chunks is not None:
+            present_in_chunks = directory_tree.present_in_chunks
+
+        file_map[this_dir_id] = {
+            "id": this_dir_id,
+            "name": _build_name(directory_tree.path),
+            "isDir": True,
+            "modDate": format_last_modified_time_as_iso(directory_tree.last_modified),
+            "childrenCount": len(directory_tree.directories),
+            "parentId": parent_id,
+            "presentInChunks": present_in_chunks
+        }
+
+        if parent_id == "":
+            file_map[this_dir_id].pop("parentId")
+
+        for f in directory_tree.files:
+            current_obj_id += 1
+            this_child_id = str(current_obj_id)
+            present_in_chunks = []
+            if f.present_in_chunks is not None:
+                present_in_chunks = f.present_in_chunks
+
+            file_map[this_child_id] = {
+                "id": this_child_id,
+                "name": _build_name(f.absolute_path),
+                "isDir": False,
+                "isHidden": False,
+                "modDate": format_last_modified_time_as_iso(f.last_modified),
+                "size": f.size,
+                "parentId": this_dir_id,
+                "presentInChunks": present_in_chunks
+            }
+            this_dir_child_ids.append(this_child_id)
+
+        for d in directory_tree.directories:
+            current_obj_id += 1
+            this_child_id = str(current_obj_id)
+            _recurse(d, this_dir_id)
+            this_dir_child_ids.append(this_child_id)
+
+        file_map[this_dir_id]["childrenIds"] = this_dir_child_ids
+
+    _recurse(directory_tree)
+
+    return file_map
+
+
+def _chunk(tree: DirectoryTree) -> None:
+    settings = ChunkerSettings()
+    settings.target_size_bytes = 100
+    divide_tree_into_chunks(tree, settings)
+
+
+def _time_per_node(func: Callable[[DirectoryTree], object], tree: DirectoryTree, n_nodes: int) -> str:
+    start = time.perf_counter()
+    try:
+        func(tree)
+    except RecursionError:
+        return "RecursionError"
+    return f"{(time.perf_counter() - start) / n_nodes * 1e6:.3f} us"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=900, help="Depth of the deep tree (recursion limit permitting).")
+    parser.add_argument("--width", type=int, default=100000, help="Number of sub directories in the wide tree.")
+    args = parser.parse_args()
+
+    cases: Dict[str, Dict[str, Callable[[DirectoryTree], object]]] = {
+        "get_all_directories": {
+            "recursive": recursive_get_all_directories,
+            "iterative": get_all_directories,
+        },
+        "build_full_listing": {
+            "recursive": lambda tree: recursive_full_listing(tree, "root"),
+            "iterative": lambda tree: build_full_listing(tree, "root"),
+        },
+        "build_react_chonky_json_listing": {
+            "recursive": lambda tree: recursive_chonky_listing(tree, "root"),
+            "iterative": lambda tree: build_react_chonky_json_listing(tree, "root"),
+        },
+        "divide_tree_into_chunks": {
+            "iterative": _chunk,
+        },
+    }
+
+    print(f"Recursion limit: {sys.getrecursionlimit()}")
+    for shape, make, size in (("deep", deep_tree, args.depth), ("wide", wide_tree, args.width)):
+        n_nodes = 2 * size
+        print(f"\n{shape} tree, {n_nodes:,} nodes")
+        for name, implementations in cases.items():
+            results = ", ".join(
+                f"{impl}: {_time_per_node(func, make(size), n_nodes)}" for impl, func in implementations.items()
+            )
+            print(f"  {name:<32} {results}")
+
+
+if __name__ == "__main__":
+    main()
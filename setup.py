@@ -33,7 +33,13 @@ def get_extras_require() -> dict:
             "setuptools",
             "pytest",
             "mypy",
-            "coverage"
+            "coverage",
+            # So that the zstd listing tests run
+            "zstandard"
+        ],
+        # For --compress-listings zstd
+        "zstd": [
+            "zstandard"
         ]
     }
 
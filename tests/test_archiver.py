@@ -3,12 +3,20 @@ from unittest.mock import patch
 import shutil
 import os
 import tempfile
-from contextlib import contextmanager
+from contextlib import contextmanager, redirect_stdout
+import io
 import datetime
-from typing import Optional, Generator, Dict
+from typing import Optional, Generator, Dict, Iterator, List
 import random
 import zipfile
 import json
+import threading
+import copy
+import gzip
+import sys
+import time
+import sqlite3
+import pytest
 
 
 from archiver.archiver import (
@@ -17,22 +25,52 @@ from archiver.archiver import (
     format_last_modified_time_as_iso,
     list_all_files,
     FileMetadata,
+    FileRuns,
     list_all_directories,
     DirectoryMetadata,
+    scan_directory,
     build_directory_tree,
     DirectoryTree,
+    ScannerSettings,
+    ScanStore,
+    StoredFiles,
+    FileTable,
+    FileSequence,
+    FileTableSlice,
+    FileView,
+    ScanCache,
+    ScanFilter,
+    HardLinkIndex,
+    scan_directories_parallel,
     build_full_listing,
+    write_full_listing,
+    build_archive_path,
+    get_archive_path,
+    ChunkIndex,
+    write_chunk_index,
+    LocateRunner,
+    Manifest,
     ChunkerSettings,
     ProgressPrinter,
     divide_tree_into_chunks,
     get_all_directories,
     get_all_files,
+    iter_files,
+    count_files,
     get_sha_sum,
     compress_chunk,
     verify_chunk,
     build_chunk_dictionary,
+    write_chunk_dictionary,
+    open_listing_output,
+    open_listing_input,
     ArchiveRunner,
-    build_react_chonky_json_listing
+    build_react_chonky_json_listing,
+    write_react_chonky_json_listing,
+    iter_react_chonky_json_listing,
+    get_html_ui_template,
+    build_html_ui,
+    write_html_ui
 )
 
 
@@ -115,13 +153,26 @@ def isolated_filesystem(temp_path: Optional[str] = None) -> Generator:
 global_objects_added = {}
 
 
+class MockBoto3Object:
+    def __init__(self, key: str):
+        self.key = key
+
+
+class MockBoto3ObjectCollection(Dict[str, str]):
+    """
+    Mocks the objects collection of a boto3 bucket, keyed by object key.
+    """
+    def all(self) -> List[MockBoto3Object]:
+        return [MockBoto3Object(key) for key in self]
+
+
 class MockBoto3Bucket:
     """
     Mocks a boto3 bucket for testing.
     """
     def __init__(self, name: str):
         self.name = name
-        self.objects: Dict[str, str] = {}
+        self.objects = MockBoto3ObjectCollection()
 
     def upload_file(self, filename: str, key: str) -> None:
         global global_objects_added
@@ -174,6 +225,17 @@ class TestFormatLastModified(unittest.TestCase):
         actual = format_last_modified_time_as_iso(timestamp)
         self.assertIn(expected, actual)
 
+    def test_format_matches_strftime(self) -> None:
+        # Times either side of the changes to and from daylight saving time in the UK in 2021, plus random times
+        rng = random.Random(0)
+        timestamps: List[float] = [t + offset for t in (1616893200, 1635642000) for offset in range(-4000, 4000, 7)]
+        timestamps += [rng.uniform(-2e9, 4e9) for _ in range(1000)]
+        for t in timestamps:
+            self.assertEqual(format_last_modified_time(t), time.strftime("%Y-%m-%d", time.localtime(t)))
+            self.assertEqual(
+                format_last_modified_time_as_iso(t), time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(t))
+            )
+
 
 class TestFormatBytes(unittest.TestCase):
     def test_zero(self) -> None:
@@ -246,6 +308,23 @@ class TestListDirectories(unittest.TestCase):
             self.assertEqual(dirs_1.absolute_path, "./dir_1_lvl_1")
 
 
+class TestScanDirectory(unittest.TestCase):
+    def test_scan_directory(self) -> None:
+        with isolated_filesystem():
+            add_mock_files()
+            files, dirs = scan_directory(".")
+
+            self.assertEqual([f.path for f in files], ["file_1.txt", "file_2.txt"])
+            self.assertEqual([f.size for f in files], [1, 2])
+            self.assertEqual({d.path for d in dirs}, {"dir_1_lvl_1", "dir_2_lvl_1", "dir_3_lvl_1"})
+
+            # Same metadata as the listdir based functions
+            self.assertEqual(files, list_all_files("."))
+            self.assertEqual(
+                sorted(dirs, key=lambda d: d.path), sorted(list_all_directories("."), key=lambda d: d.path)
+            )
+
+
 class TestBuildDirectoryTree(unittest.TestCase):
     def test_build_dir_tree_mock_data(self) -> None:
         with isolated_filesystem():
@@ -272,6 +351,50 @@ class TestBuildDirectoryTree(unittest.TestCase):
             self.assertEqual(type(tree), DirectoryTree)
             self.assertTrue(progress_printer._total_added_size > 0)
 
+    def test_build_dir_tree_parallel(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            settings = ScannerSettings()
+            settings.workers = 8
+            progress_printer = ProgressPrinter()
+            tree = build_directory_tree("test", progress_printer, settings)
+            self.assertEqual(tree, build_directory_tree("test"))
+            self.assertEqual(progress_printer._total_added_size, tree.total_size_bytes)
+            self.assertEqual(progress_printer._total_added_files, len(get_all_files(tree)))
+
+    def test_build_dir_tree_processes(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            memory_tree = build_directory_tree("test")
+            for workers in (1, 4):
+                settings = ScannerSettings()
+                settings.processes = 2
+                settings.workers = workers
+                progress_printer = ProgressPrinter()
+                tree = build_directory_tree("test", progress_printer, settings)
+                self.assertEqual(tree, memory_tree)
+                self.assertEqual(progress_printer._total_added_size, tree.total_size_bytes)
+                self.assertEqual(progress_printer._total_added_files, len(get_all_files(tree)))
+                self.assertEqual(progress_printer._total_added_directories, len(get_all_directories(tree)) - 1)
+
+                settings.file_table = FileTable()
+                compact_tree = build_directory_tree("test", scanner_settings=settings)
+                self.assertIsInstance(compact_tree.directories[0].files, FileTableSlice)
+                self.assertEqual(compact_tree, memory_tree)
+                self.assertEqual(len(settings.file_table), len(get_all_files(memory_tree)))
+
+                settings.file_table = None
+                settings.store = ScanStore(f"store_{workers}.sqlite")
+                stored_tree = build_directory_tree("test", scanner_settings=settings)
+                self.assertIsInstance(stored_tree.directories[0].files, StoredFiles)
+                self.assertEqual(stored_tree, memory_tree)
+                settings.store.close()
+
+    def test_scan_directories_parallel_error(self) -> None:
+        with isolated_filesystem():
+            with self.assertRaises(FileNotFoundError):
+                scan_directories_parallel("does_not_exist", 4)
+
     def test_get_all_files(self) -> None:
         with isolated_filesystem():
             add_mock_files()
@@ -289,6 +412,17 @@ class TestBuildDirectoryTree(unittest.TestCase):
             # Check there are no duplicates
             self.assertEqual(len(file_paths), len(set(file_paths)))
 
+    def test_iter_files(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            tree = build_directory_tree(".")
+            files = list(iter_files(tree))
+            self.assertEqual(files, get_all_files(tree))
+            self.assertEqual(len(files), count_files(tree))
+
+            # The files are the tree's own, not copies
+            self.assertIs(files[0], next(iter_files(tree)))
+
     def test_get_all_dirs(self) -> None:
         with isolated_filesystem():
             add_mock_files()
@@ -297,6 +431,458 @@ class TestBuildDirectoryTree(unittest.TestCase):
             self.assertEqual(len(dirs), 7)
 
 
+def build_deep_tree(depth: int) -> DirectoryTree:
+    """
+    Build an in-memory chain of directories, each holding a single file.
+    """
+    tree: Optional[DirectoryTree] = None
+    for level in reversed(range(depth)):
+        path = "deep" + "/d" * level
+        tree = DirectoryTree(
+            files=[FileMetadata(path="f", absolute_path=path + "/f", size=1, last_modified=0.0)],
+            total_size_bytes=depth - level,
+            directories=[tree] if tree is not None else [],
+            path=path,
+            absolute_path=path,
+            last_modified=0.0
+        )
+    assert tree is not None
+    return tree
+
+
+class TestScanStore(unittest.TestCase):
+    def test_stored_tree_matches_memory(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            for workers in (1, 4):
+                settings = ScannerSettings()
+                settings.workers = workers
+                settings.store = ScanStore(f"store_{workers}.sqlite")
+                stored_tree = build_directory_tree("test", scanner_settings=settings)
+                memory_tree = build_directory_tree("test")
+
+                self.assertIsInstance(stored_tree.files, StoredFiles)
+                self.assertEqual(stored_tree, memory_tree)
+                self.assertEqual(build_full_listing(stored_tree, "test")[1], build_full_listing(memory_tree, "test")[1])
+
+                chunker_settings = ChunkerSettings()
+                chunker_settings.target_size_bytes = 80
+                stored_chunks = divide_tree_into_chunks(stored_tree, chunker_settings)
+                memory_chunks = divide_tree_into_chunks(memory_tree, chunker_settings)
+                self.assertEqual(stored_chunks, memory_chunks)
+                self.assertEqual(
+                    build_chunk_dictionary(stored_chunks, "test"), build_chunk_dictionary(memory_chunks, "test")
+                )
+
+                # Chunk numbers are written back to the store
+                self.assertEqual(
+                    build_react_chonky_json_listing(stored_tree, "test"),
+                    build_react_chonky_json_listing(memory_tree, "test")
+                )
+                settings.store.close()
+
+    def test_split_directory_chunks_are_runs(self) -> None:
+        with isolated_filesystem():
+            os.makedirs("test/flat")
+            for i in range(100):
+                with open(f"test/flat/file_{i:03d}.txt", "w") as f:
+                    f.write("x" * 10)
+
+            settings = ScannerSettings()
+            settings.store = ScanStore("store.sqlite")
+            stored_tree = build_directory_tree("test", scanner_settings=settings)
+            memory_tree = build_directory_tree("test")
+
+            chunker_settings = ChunkerSettings()
+            chunker_settings.target_size_bytes = 80
+            stored_chunks = divide_tree_into_chunks(stored_tree, chunker_settings)
+            memory_chunks = divide_tree_into_chunks(memory_tree, chunker_settings)
+            self.assertGreater(len(stored_chunks), 10)
+            self.assertEqual(stored_chunks, memory_chunks)
+
+            # Each chunk holds one run of the stored directory rather than a list of its files
+            flat_files = stored_tree.directories[0].files
+            for chunk in stored_chunks:
+                self.assertIsInstance(chunk.files, FileRuns)
+                assert isinstance(chunk.files, FileRuns)
+                self.assertEqual(len(chunk.files.runs), 1)
+                self.assertIs(chunk.files.runs[0][0], flat_files)
+                self.assertEqual(chunk.files.size_bytes, chunk.total_size_bytes)
+            self.assertEqual(get_all_files(stored_tree), get_all_files(memory_tree))
+            settings.store.close()
+
+    def test_file_runs(self) -> None:
+        with isolated_filesystem():
+            add_mock_files()
+            store = ScanStore("store.sqlite")
+            files, _ = scan_directory("dir_1_lvl_1")
+            stored = store.add_files("dir_1_lvl_1", files)
+            listed = [FileMetadata(path="a", absolute_path="a", size=1, last_modified=0.0)]
+
+            runs = FileRuns()
+            runs.append(listed, 0)
+            for index in range(len(stored)):
+                runs.append(stored, index)
+            self.assertEqual(runs.runs, [(listed, 0, 1), (stored, 0, len(stored))])
+            self.assertEqual(list(runs), listed + files)
+            self.assertEqual(runs[1:], files)
+            self.assertEqual(runs.size_bytes, 1 + stored.size_bytes)
+
+            runs.set_chunk_no(5, 1)
+            self.assertEqual(listed[0].present_in_chunks, None)
+            self.assertEqual([f.present_in_chunks for f in stored], [[5]] * len(stored))
+            with self.assertRaises(RuntimeError):
+                runs.set_archive_directory("dir")
+            store.close()
+
+    def test_stored_files_sequence(self) -> None:
+        with isolated_filesystem():
+            add_mock_files()
+            store = ScanStore("store.sqlite")
+            files, _ = scan_directory("dir_1_lvl_1/dir_1_lvl_2")
+            stored = store.add_files("dir_1_lvl_1/dir_1_lvl_2", files)
+
+            self.assertEqual(len(stored), 1)
+            self.assertEqual(stored[0], files[0])
+            self.assertEqual(stored[-1], files[0])
+            self.assertEqual(stored[0:1], files)
+            self.assertEqual(stored.size_bytes, 80)
+            with self.assertRaises(IndexError):
+                stored[1]
+
+            stored.set_chunk_no(3)
+            self.assertEqual(stored[0].present_in_chunks, [3])
+            store.close()
+
+            with self.assertRaisesRegex(RuntimeError, "already exists"):
+                ScanStore("store.sqlite")
+
+
+class TestFileTable(unittest.TestCase):
+    def test_compact_tree_matches_memory(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            for workers in (1, 4):
+                settings = ScannerSettings()
+                settings.workers = workers
+                settings.file_table = FileTable()
+                compact_tree = build_directory_tree("test", scanner_settings=settings)
+                memory_tree = build_directory_tree("test")
+
+                self.assertIsInstance(compact_tree.files, FileTableSlice)
+                self.assertEqual(compact_tree, memory_tree)
+                self.assertEqual(len(settings.file_table), len(get_all_files(memory_tree)))
+
+                chunker_settings = ChunkerSettings()
+                chunker_settings.target_size_bytes = 80
+                self.assertEqual(
+                    divide_tree_into_chunks(compact_tree, chunker_settings),
+                    divide_tree_into_chunks(memory_tree, chunker_settings)
+                )
+                self.assertEqual(
+                    build_react_chonky_json_listing(compact_tree, "test"),
+                    build_react_chonky_json_listing(memory_tree, "test")
+                )
+
+    def test_file_view(self) -> None:
+        table = FileTable()
+        files = [
+            FileMetadata(path="a.txt", absolute_path="dir/a.txt", size=1, last_modified=1.5),
+            FileMetadata(path="\u00e9.txt", absolute_path="dir/\u00e9.txt", size=2, last_modified=2.5,
+                         present_in_chunks=[4]),
+        ]
+        files_slice = table.add_files("dir", files)
+        other_slice = table.add_files("other", [FileMetadata(path="b", absolute_path="other/b", size=3,
+                                                             last_modified=0.0)])
+
+        self.assertEqual(list(files_slice), files)
+        self.assertEqual(files_slice.size_bytes, 3)
+        self.assertEqual(other_slice[0].absolute_path, "other/b")
+        self.assertTrue(table.nbytes() > 0)
+
+        view = files_slice[0]
+        self.assertIsInstance(view, FileView)
+        self.assertIsInstance(view, FileMetadata)
+        view.size += 10
+        view.present_in_chunks = [1, 2]
+        self.assertEqual(files_slice[0].size, 11)
+        self.assertEqual(files_slice[0].present_in_chunks, [1, 2])
+
+        files_slice.set_chunk_no(7)
+        self.assertEqual([f.present_in_chunks for f in files_slice], [[7], [7]])
+        self.assertEqual(other_slice[0].present_in_chunks, None)
+        files_slice.set_chunk_no(8, 1, 2)
+        self.assertEqual([f.present_in_chunks for f in files_slice], [[7], [8]])
+
+        # Deep copies are independent FileMetadata
+        copies = copy.deepcopy(files_slice)
+        self.assertEqual(type(copies[0]), FileMetadata)
+        copies[0].size = 0
+        self.assertEqual(files_slice[0].size, 11)
+
+    def test_file_sequence_is_abstract(self) -> None:
+        class ReadOnlyFiles(FileSequence):
+            def __len__(self) -> int:
+                return 0
+
+            def _read(self, start: int, stop: int) -> Iterator[FileMetadata]:
+                return iter([])
+
+        # A missing override fails as the files are created, rather than once the chunks are assigned
+        with self.assertRaisesRegex(TypeError, "set_archive_directory"):
+            ReadOnlyFiles()  # type: ignore[abstract]
+
+
+class TestScanCache(unittest.TestCase):
+    def test_rescan_reuses_unchanged_directories(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            n_directories = len(get_all_directories(build_directory_tree("test")))
+            for workers, processes in ((1, 1), (4, 1), (1, 2)):
+                cache = ScanCache("cache.json")
+                settings = ScannerSettings(workers=workers, processes=processes, cache=cache)
+                build_directory_tree("test", scanner_settings=settings)
+                self.assertEqual((cache.hits, cache.misses), (0, n_directories))
+                cache.save()
+
+                settings.cache = ScanCache("cache.json")
+                memory_tree = build_directory_tree("test")
+                self.assertEqual(
+                    settings.cache.previous_totals(), (count_files(memory_tree), memory_tree.total_size_bytes)
+                )
+                self.assertEqual(build_directory_tree("test", scanner_settings=settings), memory_tree)
+                self.assertEqual((settings.cache.hits, settings.cache.misses), (n_directories, 0))
+
+                # Adding a file changes the modification time of its directory only
+                with open("test/folder_1/folder_0/new.txt", "w") as f:
+                    f.write("new")
+                os.utime("test/folder_1/folder_0", (1, 1))
+                settings.cache = ScanCache("cache.json")
+                tree = build_directory_tree("test", scanner_settings=settings)
+                self.assertEqual(tree, build_directory_tree("test"))
+                self.assertEqual((settings.cache.hits, settings.cache.misses), (n_directories - 1, 1))
+
+                os.remove("test/folder_1/folder_0/new.txt")
+                os.remove("cache.json")
+
+    def test_cache_version(self) -> None:
+        with isolated_filesystem():
+            add_mock_files()
+            with open("cache.json", "w") as f:
+                json.dump({"version": 0, "directories": {os.path.abspath("."): [0, [], []]}}, f)
+            cache = ScanCache("cache.json")
+            build_directory_tree(".", scanner_settings=ScannerSettings(cache=cache))
+            self.assertEqual(cache.hits, 0)
+
+
+class TestScanFilter(unittest.TestCase):
+    def test_is_excluded(self) -> None:
+        scan_filter = ScanFilter(
+            "root",
+            [("*.tmp", True), ("cache/", True), ("a/b/*.txt", True), ("/top.txt", True), ("keep.tmp", False)]
+        )
+        self.assertTrue(scan_filter.is_excluded("", "x.tmp", False))
+        self.assertTrue(scan_filter.is_excluded("a/", "x.tmp", False))
+        self.assertFalse(scan_filter.is_excluded("a/", "keep.tmp", False))
+        self.assertTrue(scan_filter.is_excluded("a/", "cache", True))
+        self.assertFalse(scan_filter.is_excluded("a/", "cache", False))
+        self.assertTrue(scan_filter.is_excluded("a/b/", "c.txt", False))
+        self.assertFalse(scan_filter.is_excluded("a/", "c.txt", False))
+        self.assertTrue(scan_filter.is_excluded("", "top.txt", False))
+        self.assertFalse(scan_filter.is_excluded("a/", "top.txt", False))
+        self.assertFalse(scan_filter.is_excluded("", "other", False))
+        self.assertEqual(scan_filter.relative_directory(os.path.join("root", "a", "b")), "a/b/")
+        self.assertEqual(scan_filter.relative_directory("root"), "")
+
+    def test_wildcards_match_within_directories(self) -> None:
+        scan_filter = ScanFilter("root", [("a/*.txt", True), ("data/**/*.tmp", True), ("**/build/", True)])
+        self.assertTrue(scan_filter.is_excluded("a/", "c.txt", False))
+        self.assertFalse(scan_filter.is_excluded("a/b/", "c.txt", False))
+        self.assertTrue(scan_filter.is_excluded("data/", "x.tmp", False))
+        self.assertTrue(scan_filter.is_excluded("data/sub/deep/", "x.tmp", False))
+        self.assertFalse(scan_filter.is_excluded("other/", "x.tmp", False))
+        self.assertTrue(scan_filter.is_excluded("", "build", True))
+        self.assertTrue(scan_filter.is_excluded("a/b/", "build", True))
+        self.assertFalse(scan_filter.is_excluded("a/b/", "build", False))
+
+        scan_filter = ScanFilter("root", [("a/**", True), ("?.log", True), ("[!x]y.dat", True)])
+        self.assertTrue(scan_filter.is_excluded("a/b/", "c.txt", False))
+        self.assertFalse(scan_filter.is_excluded("", "a", True))
+        self.assertTrue(scan_filter.is_excluded("b/", "c.log", False))
+        self.assertFalse(scan_filter.is_excluded("b/", "cc.log", False))
+        self.assertTrue(scan_filter.is_excluded("", "zy.dat", False))
+        self.assertFalse(scan_filter.is_excluded("", "xy.dat", False))
+
+    def test_excluded_directories_not_scanned(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            scan_filter = ScanFilter.from_arguments("test", ["folder_1/", "file_0.txt"], ["folder_2/file_0.txt"])
+            expected = None
+            for workers, processes in ((1, 1), (4, 1), (1, 2)):
+                settings = ScannerSettings(workers=workers, processes=processes, scan_filter=scan_filter)
+                with patch("archiver.archiver.os.scandir", wraps=os.scandir) as scandir:
+                    tree = build_directory_tree("test", scanner_settings=settings)
+                if processes == 1:
+                    self.assertFalse(any("folder_1" in call.args[0] for call in scandir.call_args_list))
+
+                directories = get_all_directories(tree)
+                self.assertFalse(any(os.path.basename(d) == "folder_1" for d in directories))
+                self.assertEqual(
+                    [f.absolute_path for f in iter_files(tree) if f.path == "file_0.txt"],
+                    [os.path.join("test", "folder_2", "file_0.txt")]
+                )
+                if expected is None:
+                    expected = tree
+                self.assertEqual(tree, expected)
+
+    def test_ignore_file(self) -> None:
+        with isolated_filesystem():
+            add_mock_files()
+            with open(ScanFilter.IGNORE_FILE, "w") as f:
+                f.write("# Scratch space\n\ndir_1_lvl_1/dir_1_lvl_2\n*.txt\n!file_2.txt\n")
+            scan_filter = ScanFilter.from_arguments(".", ["dir_3_lvl_1"])
+            tree = build_directory_tree(".", scanner_settings=ScannerSettings(scan_filter=scan_filter))
+
+            self.assertEqual(sorted(f.path for f in iter_files(tree)), [ScanFilter.IGNORE_FILE, "file_2.txt"])
+            self.assertEqual(
+                sorted(os.path.relpath(d) for d in get_all_directories(tree)),
+                [".", "dir_1_lvl_1", os.path.join("dir_1_lvl_1", "dir_2_lvl_2"), "dir_2_lvl_1"]
+            )
+
+
+def add_hard_links() -> None:
+    os.makedirs("test/a/b")
+    os.mkdir("test/c")
+    with open("test/a/big.dat", "w") as f:
+        f.write("-" * 100)
+    with open("test/c/small.dat", "w") as f:
+        f.write("-" * 10)
+    os.link("test/a/big.dat", "test/a/b/big_link.dat")
+    os.link("test/a/big.dat", "test/c/big_link.dat")
+    # Linked to a file outside of the input directory only, so archived as normal
+    os.link("test/c/small.dat", "outside.dat")
+
+
+class TestHardLinks(unittest.TestCase):
+    def test_hard_links_resolved(self) -> None:
+        with isolated_filesystem():
+            add_hard_links()
+            # The first path in sort order is archived
+            expected_links = {
+                os.path.join("test", "a", "big.dat"): os.path.join("test", "a", "b", "big_link.dat"),
+                os.path.join("test", "c", "big_link.dat"): os.path.join("test", "a", "b", "big_link.dat"),
+            }
+            scan_cache: Optional[ScanCache] = None
+            for workers, processes, cache_path in ((1, 1, None), (4, 1, None), (1, 2, None), (1, 1, "cache.json")):
+                for _ in range(2):
+                    scan_cache = ScanCache(cache_path) if cache_path is not None else None
+                    settings = ScannerSettings(
+                        workers=workers, processes=processes, hard_links=HardLinkIndex(), cache=scan_cache
+                    )
+                    tree = build_directory_tree("test", scanner_settings=settings)
+                    assert settings.hard_links is not None
+                    self.assertEqual(settings.hard_links.links, expected_links)
+                    self.assertEqual(settings.hard_links.bytes_saved, 200)
+                    if scan_cache is not None:
+                        scan_cache.save()
+
+                    self.assertEqual(count_files(tree), 4)
+                    self.assertEqual(tree.total_size_bytes, 110)
+                    sizes = {os.path.basename(d.path): d.total_size_bytes for d in tree.directories}
+                    self.assertEqual(sizes, {"a": 100, "c": 10})
+
+            # A cached scan of the directories is reused along with their hard links
+            assert scan_cache is not None
+            self.assertEqual(scan_cache.hits, 4)
+
+    def test_hard_links_archived_once(self) -> None:
+        with isolated_filesystem():
+            add_hard_links()
+            settings = ScannerSettings(hard_links=HardLinkIndex())
+            tree = build_directory_tree("test", scanner_settings=settings)
+            assert settings.hard_links is not None
+            links = settings.hard_links.links
+
+            chunker_settings = ChunkerSettings()
+            chunker_settings.target_size_bytes = 1000
+            chunks = divide_tree_into_chunks(tree, chunker_settings, links)
+            self.assertEqual(len(chunks), 1)
+            self.assertEqual(chunks[0].total_size_bytes, 110)
+
+            compress_chunk(chunks[0], 0, "test_archive", "test", links)
+            with zipfile.ZipFile("test_archive/Chunks/Chunk0000000.zip") as zip_file:
+                self.assertEqual(sorted(zip_file.namelist()), ["test/a/b/big_link.dat", "test/c/small.dat"])
+            self.assertFalse(os.path.exists("test_archive/Chunks/Chunk0000000ERROR.txt"))
+
+            header, listing = build_full_listing(tree, "test", hard_links=links)
+            self.assertIn("Hard Links: 2 (200 Bytes not archived again)", header)
+            self.assertIn("test/c/big_link.dat  100 -> test/a/b/big_link.dat\n", listing)
+            self.assertIn("test/a/b/big_link.dat  100\n", listing)
+            self.assertIn(
+                "test/a/big.dat  100 -> test/a/b/big_link.dat\n", build_chunk_dictionary(chunks, "test", links)
+            )
+            self.assertNotIn("Hard Links", build_full_listing(tree, "test")[0])
+
+            manifest = Manifest("Manifest.sqlite")
+            with open("FullListing.txt", "w") as f:
+                write_full_listing(f, tree, "test", hard_links=links, manifest=manifest)
+            manifest.close()
+            connection = sqlite3.connect("Manifest.sqlite")
+            self.assertEqual(
+                connection.execute("SELECT link_target FROM files WHERE path = 'test/c/big_link.dat'").fetchone(),
+                ("test/a/b/big_link.dat",)
+            )
+            connection.close()
+
+            # Links are indexed with the chunk of the file archived in their place
+            write_chunk_index("ChunkIndex.bin", chunks, "test", links)
+            with ChunkIndex("ChunkIndex.bin") as index:
+                self.assertEqual(len(index), count_files(tree))
+                self.assertEqual(index.find("test/a/big.dat"), 0)
+
+    def test_archive_runner_dedupe_hard_links(self) -> None:
+        with isolated_filesystem():
+            add_hard_links()
+            for args, n_archived in (([], 4), (["--dedupe-hard-links"], 2)):
+                shutil.rmtree("test_archive", ignore_errors=True)
+                os.mkdir("test_archive")
+                runner = ArchiveRunner()
+                runner.parse_arguments(["--output-dir", "test_archive", "--input-dir", "test"] + args)
+                runner.run()
+                with zipfile.ZipFile("test_archive/Chunks/Chunk0000000.zip") as zip_file:
+                    self.assertEqual(len(zip_file.namelist()), n_archived)
+
+
+class TestDeepTrees(unittest.TestCase):
+    def test_deep_tree_in_memory(self) -> None:
+        depth = 5000
+        tree = build_deep_tree(depth)
+
+        self.assertEqual(len(get_all_directories(tree)), depth)
+        self.assertEqual(len(get_all_files(tree)), depth)
+        _, listing = build_full_listing(tree, "deep")
+        self.assertEqual(listing.count("\n"), depth)
+        self.assertEqual(len(build_react_chonky_json_listing(tree, "deep")), 2 * depth)
+
+        settings = ChunkerSettings()
+        settings.target_size_bytes = 100
+        chunks = divide_tree_into_chunks(tree, settings)
+        self.assertEqual(sum(c.total_size_bytes for c in chunks), depth)
+
+    def test_deep_tree_on_disk(self) -> None:
+        with isolated_filesystem():
+            depth = 1100
+            # os.makedirs is recursive, so create the directories top down
+            for level in range(depth):
+                os.mkdir("deep" + "/d" * level)
+            tree = build_directory_tree("deep")
+            self.assertEqual(len(get_all_directories(tree)), depth)
+
+            # shutil.rmtree is recursive, so remove the directories bottom up
+            for level in reversed(range(depth)):
+                os.rmdir("deep" + "/d" * level)
+
+
 class TestCreateListing(unittest.TestCase):
     def test_create_listing(self) -> None:
         with isolated_filesystem():
@@ -315,6 +901,40 @@ class TestCreateListing(unittest.TestCase):
             self.assertIn(expected_str, listing)
             self.assertIn("Total Size: 243 Bytes", header)
 
+    def test_write_full_listing(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            tree = build_directory_tree("test")
+            header, listing = build_full_listing(tree, "test", line_prefix="> ")
+
+            # Small blocks, so that the listing is written in several
+            with patch("archiver.archiver.LISTING_BLOCK_LINES", 7):
+                with open("listing.txt", "w") as f:
+                    write_full_listing(f, tree, "test", line_prefix="> ", header=header)
+            with open("listing.txt") as f:
+                self.assertEqual(f.read(), header + listing)
+
+            with open("listing.txt", "w") as f:
+                write_full_listing(f, tree, "test")
+            with open("listing.txt") as f:
+                written = f.read()
+            self.assertIn(f"Total Files: {count_files(tree):,}", written)
+            self.assertTrue(written.endswith(build_full_listing(tree, "test")[1]))
+
+    def test_archive_paths_set_at_scan(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            for n, input_directory in enumerate(("test", "test/")):
+                for settings in (ScannerSettings(), ScannerSettings(file_table=FileTable()),
+                                 ScannerSettings(store=ScanStore(f"store_{n}.sqlite")), ScannerSettings(processes=2)):
+                    tree = build_directory_tree(input_directory, scanner_settings=settings)
+                    files = get_all_files(tree)
+                    self.assertTrue(all(f.archive_directory is not None for f in files))
+                    self.assertEqual(
+                        [get_archive_path(f, input_directory) for f in files],
+                        [build_archive_path(input_directory, f.absolute_path) for f in files]
+                    )
+
 
 class TestChunkerSettings(unittest.TestCase):
     def test_chunker_settings(self) -> None:
@@ -356,6 +976,71 @@ class TestProgressPrinter(unittest.TestCase):
         self.assertAlmostEqual(progress_printer._total_added_files, 2)
         self.assertAlmostEqual(progress_printer._total_added_size, 25)
 
+    def test_progress_printer_threads(self) -> None:
+        progress_printer = ProgressPrinter()
+        files = [FileMetadata(path="test", absolute_path="test", size=3, last_modified=0.0)]
+
+        def _report() -> None:
+            for _ in range(1000):
+                progress_printer.on_directory_tree_progress(files, [])
+
+        threads = [threading.Thread(target=_report) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(progress_printer._total_added_files, 8000)
+        self.assertEqual(progress_printer._total_added_size, 24000)
+
+    def test_progress_printer_ticks(self) -> None:
+        class MockBar:
+            def __init__(self) -> None:
+                self.calls = 0
+                self.count = 0
+                self.text = ""
+
+            def __call__(self, count: int) -> None:
+                self.calls += 1
+                self.count += count
+
+        bar = MockBar()
+        progress_printer = ProgressPrinter()
+        progress_printer.set_alive_bar(bar)
+        files = [FileMetadata(path="test", absolute_path="test", size=3, last_modified=0.0)]
+        for _ in range(10000):
+            progress_printer.on_directory_tree_progress(files, [])
+
+        # The bar is only moved on once per tick
+        self.assertLess(bar.calls, 100)
+        progress_printer.flush()
+        self.assertEqual(bar.count, 10000)
+        self.assertIn("files/s", bar.text)
+        self.assertNotIn("ETA", bar.text)
+
+        counters = progress_printer.get_counters()
+        self.assertEqual((counters.files, counters.directories, counters.size_bytes), (10000, 0, 30000))
+        self.assertGreater(counters.files_per_second, 0)
+        self.assertAlmostEqual(counters.bytes_per_second, 3 * counters.files_per_second)
+        self.assertIsNone(counters.eta_seconds)
+
+    def test_progress_printer_eta(self) -> None:
+        progress_printer = ProgressPrinter()
+        progress_printer.start(expected_files=100, expected_size_bytes=1000)
+        with patch("archiver.archiver.time.monotonic", return_value=progress_printer._start_time + 10):
+            progress_printer.on_scan_progress(10, 2, 250)
+            counters = progress_printer.get_counters()
+        self.assertAlmostEqual(counters.bytes_per_second, 25)
+        assert counters.eta_seconds is not None
+        self.assertAlmostEqual(counters.eta_seconds, 30)
+
+        progress_printer.start(expected_files=100)
+        with patch("archiver.archiver.time.monotonic", return_value=progress_printer._start_time + 10):
+            progress_printer.on_scan_progress(10, 2, 250)
+            eta_seconds = progress_printer.get_counters().eta_seconds
+        assert eta_seconds is not None
+        self.assertAlmostEqual(eta_seconds, 90)
+
 
 class TestShaSum(unittest.TestCase):
     def test_sha_sum(self) -> None:
@@ -519,6 +1204,173 @@ class TestSaveChunks(unittest.TestCase):
             self.assertIn("Chunk 0000002: ", chunk_dict)
             self.assertTrue(len(chunk_dict) > 1000)
 
+    def test_write_chunk_dictionary_from_listings(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            tree = build_directory_tree("test")
+            settings = ChunkerSettings()
+            settings.target_size_bytes = 8000
+            chunks = divide_tree_into_chunks(tree, settings)
+            for idx, chunk in enumerate(chunks):
+                compress_chunk(chunk, idx, "test_archive", "test")
+            expected = build_chunk_dictionary(chunks, "test")
+
+            # Read the listings in small blocks, so that lines are split across them
+            with patch("archiver.archiver.LISTING_READ_CHARS", 10):
+                with patch("archiver.archiver.write_full_listing") as write_full_listing:
+                    with open("ChunkDictionary.txt", "w") as f:
+                        write_chunk_dictionary(f, chunks, "test", chunk_directory="test_archive/Chunks")
+                    write_full_listing.assert_not_called()
+            with open("ChunkDictionary.txt") as f:
+                self.assertEqual(f.read(), expected)
+
+            # Listings which are missing, or not of the chunk, are formatted from the tree instead
+            os.remove("test_archive/Chunks/Chunk0000000Listing.txt")
+            with open("test_archive/Chunks/Chunk0000001Listing.txt", "w") as f:
+                f.write("Not a listing\n")
+            with open("ChunkDictionary.txt", "w") as f:
+                write_chunk_dictionary(f, chunks, "test", chunk_directory="test_archive/Chunks")
+            with open("ChunkDictionary.txt") as f:
+                self.assertEqual(f.read(), expected)
+
+
+class TestChunkIndex(unittest.TestCase):
+    def test_chunk_index(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            tree = build_directory_tree("test")
+            settings = ChunkerSettings()
+            settings.target_size_bytes = 8000
+            chunks = divide_tree_into_chunks(tree, settings)
+            self.assertGreater(len(chunks), 2)
+            write_chunk_index("ChunkIndex.bin", chunks, "test")
+
+            expected = {}
+            for chunk_number, chunk in enumerate(chunks):
+                for f in get_all_files(chunk):
+                    expected[build_archive_path("test", f.absolute_path)] = chunk_number
+
+            with ChunkIndex("ChunkIndex.bin") as index:
+                self.assertEqual(len(index), len(expected))
+                for archive_path, chunk_number in expected.items():
+                    self.assertEqual(index.find(archive_path), chunk_number)
+                self.assertIsNone(index.find("test/folder_0"))
+                self.assertIsNone(index.find("test/folder_0/file_99.txt"))
+                self.assertIsNone(index.find(""))
+
+                in_folder = sorted((p, c) for p, c in expected.items() if p.startswith("test/folder_1/"))
+                self.assertEqual(list(index.iter_directory("test/folder_1/")), in_folder)
+                self.assertEqual(list(index.iter_directory("test/folder_1")), in_folder)
+                self.assertEqual(index.directory_chunks("test/folder_1"), sorted({c for _, c in in_folder}))
+                self.assertEqual(index.directory_chunks("test"), list(range(len(chunks))))
+                self.assertEqual(list(index.iter_directory("test/folder_9")), [])
+
+            with open("NotAnIndex.bin", "w") as not_an_index:
+                not_an_index.write("Not an index")
+            with self.assertRaisesRegex(RuntimeError, "is not a chunk index"):
+                ChunkIndex("NotAnIndex.bin")
+
+    def test_locate_runner(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            os.mkdir("test_archive")
+            runner = ArchiveRunner()
+            runner.parse_arguments(
+                ["--output-dir", "test_archive", "--input-dir", "test", "--target-chunk-size-mb", "0.01"]
+            )
+            runner.run()
+
+            with ChunkIndex("test_archive/ChunkIndex.bin") as index:
+                archive_path, chunk_number = next(index.iter_directory("test/folder_2"))
+                n_files = sum(1 for _ in index.iter_directory("test/folder_2"))
+                chunk_numbers = index.directory_chunks("test/folder_2")
+
+            def _locate(args: List[str]) -> List[str]:
+                locate_runner = LocateRunner()
+                locate_runner.parse_arguments(args)
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    locate_runner.run()
+                return output.getvalue().splitlines()
+
+            self.assertEqual(_locate(["test_archive", archive_path]), [f"Chunk{chunk_number:07d}.zip {archive_path}"])
+            self.assertEqual(len(_locate(["test_archive", "test/folder_2"])), n_files)
+            self.assertEqual(
+                _locate(["test_archive", "test/folder_2/", "--chunks"]), [f"Chunk{n:07d}.zip" for n in chunk_numbers]
+            )
+
+            with self.assertRaisesRegex(RuntimeError, "is not in the archive"):
+                _locate(["test_archive", "test/folder_9"])
+            with self.assertRaisesRegex(RuntimeError, "does not exist"):
+                _locate(["test", "test/folder_2"])
+
+            # The archiver's own help points to locate, which is dispatched before its arguments are parsed
+            help_output = io.StringIO()
+            with redirect_stdout(help_output), self.assertRaises(SystemExit):
+                ArchiveRunner().parse_arguments(["--help"])
+            self.assertIn("archiver locate", help_output.getvalue())
+
+
+class TestManifest(unittest.TestCase):
+    def test_manifest(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            tree = build_directory_tree("test")
+            settings = ChunkerSettings()
+            settings.target_size_bytes = 8000
+            chunks = divide_tree_into_chunks(tree, settings)
+            for idx, chunk in enumerate(chunks):
+                compress_chunk(chunk, idx, "test_archive", "test")
+
+            # Small batches, so that the rows are inserted in several
+            manifest = Manifest("Manifest.sqlite")
+            with patch("archiver.archiver.MANIFEST_BATCH_ROWS", 7):
+                with open("FullListing.txt", "w") as f:
+                    write_full_listing(f, tree, "test", manifest=manifest)
+            manifest.add_chunks(chunks, "test_archive/Chunks")
+            manifest.close()
+
+            with self.assertRaisesRegex(RuntimeError, "already exists"):
+                Manifest("Manifest.sqlite")
+
+            connection = sqlite3.connect("Manifest.sqlite")
+            files = get_all_files(tree)
+            self.assertEqual(
+                sorted(connection.execute("SELECT path, size, last_modified, chunk FROM files")),
+                sorted(
+                    (build_archive_path("test", f.absolute_path), f.size, f.last_modified, f.present_in_chunks[0])
+                    for f in files if f.present_in_chunks is not None
+                )
+            )
+            self.assertEqual(len(files), connection.execute("SELECT COUNT(*) FROM files").fetchone()[0])
+
+            # Total bytes of each top level folder, and the chunks holding files within one
+            folders = connection.execute(
+                "SELECT d.path, d.total_size_bytes FROM directories d JOIN directories p ON d.parent_id = p.id"
+                " WHERE p.path = 'test' ORDER BY d.path"
+            ).fetchall()
+            self.assertEqual(
+                folders, sorted((f"test/{os.path.basename(d.path)}", d.total_size_bytes) for d in tree.directories)
+            )
+            folder_chunks = connection.execute(
+                "SELECT DISTINCT chunk FROM files WHERE path LIKE 'test/folder_1/%' ORDER BY chunk"
+            ).fetchall()
+            expected_chunks = {
+                c for c, chunk in enumerate(chunks) for g in get_all_files(chunk)
+                if g.absolute_path.startswith("test/folder_1/")
+            }
+            self.assertEqual([c for c, in folder_chunks], sorted(expected_chunks))
+
+            rows = connection.execute("SELECT id, file_name, file_count, size_bytes, sha256 FROM chunks").fetchall()
+            self.assertEqual(len(rows), len(chunks))
+            for chunk_number, file_name, file_count, size_bytes, sha256 in rows:
+                self.assertEqual(file_name, f"Chunk{chunk_number:07d}.zip")
+                self.assertEqual(file_count, count_files(chunks[chunk_number]))
+                self.assertEqual(size_bytes, chunks[chunk_number].total_size_bytes)
+                with open(f"test_archive/Chunks/Chunk{chunk_number:07d}Hash.txt") as f:
+                    self.assertIn(sha256, f.read())
+            connection.close()
+
 
 class TestArchiveRunner(unittest.TestCase):
     def test_archive_runner_good_input(self) -> None:
@@ -541,6 +1393,34 @@ class TestArchiveRunner(unittest.TestCase):
         self.assertEqual(runner._chunker_settings.target_size_bytes, 1 * 1024 * 1024)
         runner.parse_arguments(["--output-dir", "test_archive", "--input-dir", "test", "--verbose"])
         self.assertEqual(runner._verbose, True)
+        self.assertEqual(runner._scanner_settings.workers, 1)
+        runner.parse_arguments(["--output-dir", "test_archive", "--input-dir", "test", "--scan-workers", "32"])
+        self.assertEqual(runner._scanner_settings.workers, 32)
+
+        with self.assertRaisesRegex(ValueError, "Number of scan workers must be at least 1"):
+            runner.parse_arguments(["--output-dir", "test_archive", "--input-dir", "test", "--scan-workers", "0"])
+
+        self.assertEqual(runner._scan_cache_path, None)
+        runner.parse_arguments(["--output-dir", "test_archive", "--input-dir", "test", "--scan-cache", "cache.json"])
+        self.assertEqual(runner._scan_cache_path, "cache.json")
+
+        self.assertEqual(runner._exclude_patterns, [])
+        runner.parse_arguments(
+            ["--output-dir", "o", "--input-dir", "i", "--exclude", ".git", "--exclude", "*.tmp", "--include", "a.tmp"]
+        )
+        self.assertEqual(runner._exclude_patterns, [".git", "*.tmp"])
+        self.assertEqual(runner._include_patterns, ["a.tmp"])
+
+        self.assertEqual(runner._dedupe_hard_links, False)
+        runner.parse_arguments(["--output-dir", "o", "--input-dir", "i", "--dedupe-hard-links"])
+        self.assertEqual(runner._dedupe_hard_links, True)
+
+        self.assertEqual(runner._scanner_settings.processes, 1)
+        runner.parse_arguments(["--output-dir", "test_archive", "--input-dir", "test", "--scan-processes", "4"])
+        self.assertEqual(runner._scanner_settings.processes, 4)
+
+        with self.assertRaisesRegex(ValueError, "Number of scan processes must be at least 1"):
+            runner.parse_arguments(["--output-dir", "test_archive", "--input-dir", "test", "--scan-processes", "0"])
 
         with self.assertRaisesRegex(ValueError, "Target chunk size must be at least 1"):
             runner.parse_arguments(
@@ -593,13 +1473,118 @@ class TestArchiveRunner(unittest.TestCase):
 
             runner.run()
 
+            counters = runner.get_progress()
+            assert counters is not None
+            self.assertEqual(counters.files, count_files(build_directory_tree("test")))
+            self.assertEqual(
+                list(runner.get_stage_seconds()),
+                ["scan", "listing", "chunking", "compress", "dictionary", "index", "full_listing", "web"]
+            )
+
             self.assertTrue(os.path.exists("test_archive/Chunks/Chunk0000000.zip"))
             self.assertTrue(os.path.exists("test_archive/Chunks/Chunk0000000Listing.txt"))
             self.assertTrue(os.path.exists("test_archive/Chunks/Chunk0000000Check.txt"))
             self.assertTrue(os.path.exists("test_archive/Chunks/Chunk0000000Hash.txt"))
             self.assertTrue(os.path.exists("test_archive/ChunkDictionary.txt"))
+            self.assertTrue(os.path.exists("test_archive/ChunkIndex.bin"))
+            self.assertTrue(os.path.exists("test_archive/Manifest.sqlite"))
             self.assertTrue(os.path.exists("test_archive/FullListing.txt"))
 
+    def test_archive_runner_run_metadata_modes(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            os.mkdir("test_archive")
+            runner = ArchiveRunner()
+            runner.parse_arguments(["--output-dir", "test_archive", "--input-dir", "test"])
+            runner.run()
+
+            for mode_args in (
+                ["--scan-store", "store.sqlite"],
+                ["--compact-metadata"],
+                ["--scan-processes", "2", "--compact-metadata"],
+                ["--scan-cache", "cache.json"],
+                ["--scan-cache", "cache.json"],
+            ):
+                shutil.rmtree("test_archive_mode", ignore_errors=True)
+                os.mkdir("test_archive_mode")
+                runner.parse_arguments(["--output-dir", "test_archive_mode", "--input-dir", "test"] + mode_args)
+                runner.run()
+
+                self.assertFalse(os.path.exists("store.sqlite"))
+                for name in ("ChunkDictionary.txt", "WebFileListing.json", "FullListing.txt"):
+                    with open(os.path.join("test_archive", name)) as f:
+                        expected = [line for line in f if not line.startswith("Printed on:")]
+                    with open(os.path.join("test_archive_mode", name)) as f:
+                        self.assertEqual([line for line in f if not line.startswith("Printed on:")], expected)
+
+            with self.assertRaisesRegex(RuntimeError, "Cannot enable --compact-metadata and --scan-store"):
+                runner.parse_arguments(
+                    ["--output-dir", "o", "--input-dir", "test", "--compact-metadata", "--scan-store", "s.sqlite"]
+                )
+
+    def test_archive_runner_compress_listings(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            os.mkdir("test_archive")
+            os.mkdir("test_archive_gzip")
+            runner = ArchiveRunner()
+            runner.parse_arguments(["--output-dir", "test_archive", "--input-dir", "test"])
+            runner.run()
+            runner.parse_arguments(
+                ["--output-dir", "test_archive_gzip", "--input-dir", "test", "--compress-listings", "gzip"]
+            )
+            runner.run()
+
+            for name in ("ChunkDictionary.txt", "WebFileListing.json", "FullListing.txt"):
+                self.assertFalse(os.path.exists(os.path.join("test_archive_gzip", name)))
+                with open(os.path.join("test_archive", name)) as f:
+                    expected = [line for line in f if not line.startswith("Printed on:")]
+                with gzip.open(os.path.join("test_archive_gzip", name + ".gz"), "rt") as f:
+                    self.assertEqual([line for line in f if not line.startswith("Printed on:")], expected)
+
+            with patch.dict(sys.modules, {"zstandard": None}):
+                with self.assertRaisesRegex(RuntimeError, "needs the zstandard package"):
+                    runner.parse_arguments(
+                        ["--output-dir", "o", "--input-dir", "test", "--compress-listings", "zstd"]
+                    )
+            with self.assertRaisesRegex(SystemExit, "2"):
+                runner.parse_arguments(["--output-dir", "o", "--input-dir", "test", "--compress-listings", "bz2"])
+
+    def test_archive_runner_compress_listings_zstd(self) -> None:
+        zstandard = pytest.importorskip("zstandard")
+        with isolated_filesystem():
+            add_mock_files_many()
+            os.mkdir("test_archive")
+            os.mkdir("test_archive_zstd")
+            runner = ArchiveRunner()
+            runner.parse_arguments(["--output-dir", "test_archive", "--input-dir", "test"])
+            runner.run()
+            runner.parse_arguments(
+                ["--output-dir", "test_archive_zstd", "--input-dir", "test", "--compress-listings", "zstd"]
+            )
+            runner.run()
+
+            for name in ("ChunkDictionary.txt", "WebFileListing.json", "FullListing.txt"):
+                self.assertFalse(os.path.exists(os.path.join("test_archive_zstd", name)))
+                with open(os.path.join("test_archive", name)) as f:
+                    expected = [line for line in f if not line.startswith("Printed on:")]
+                with open(os.path.join("test_archive_zstd", name + ".zst"), "rb") as compressed:
+                    with zstandard.ZstdDecompressor().stream_reader(compressed) as reader:
+                        lines = io.TextIOWrapper(reader, encoding="utf-8").readlines()
+                self.assertEqual([line for line in lines if not line.startswith("Printed on:")], expected)
+
+            # Written in many small blocks, as a large listing is
+            with open_listing_output("Listing.txt.zst", "zstd") as f:
+                for i in range(10000):
+                    f.write(f"line {i}\n")
+            with open("Listing.txt.zst", "rb") as compressed:
+                with zstandard.ZstdDecompressor().stream_reader(compressed) as reader:
+                    self.assertEqual(
+                        reader.read().decode("utf-8"), "".join(f"line {i}\n" for i in range(10000))
+                    )
+            with open_listing_input("Listing.txt.zst", "zstd") as f:
+                self.assertEqual(f.read(), "".join(f"line {i}\n" for i in range(10000)))
+
     def test_archive_runner_upload(self) -> None:
         # patch boto3.Session to return a mock session
         with isolated_filesystem():
@@ -652,6 +1637,8 @@ class TestArchiveRunner(unittest.TestCase):
                 self.assertIn(blob_filename, file_name)
 
             self.assertIn("test/ChunkDictionary.txt", global_objects_added)
+            self.assertIn("test/ChunkIndex.bin", global_objects_added)
+            self.assertIn("test/Manifest.sqlite", global_objects_added)
             self.assertIn("test/FullListing.txt", global_objects_added)
 
             self.assertIn("test/Chunks/Chunk0000000.zip", global_objects_added)
@@ -763,3 +1750,76 @@ class TestChonkyJSONExport(unittest.TestCase):
 
                 # Check the name looks correct - should not contain /
                 self.assertNotIn("/", value["name"])
+
+    def test_write_chonky_json_listing(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            tree = build_directory_tree("test")
+            settings = ChunkerSettings()
+            settings.target_size_bytes = 80
+            _ = divide_tree_into_chunks(tree, settings)
+
+            # Small blocks, so that the entries are written in several
+            with patch("archiver.archiver.LISTING_BLOCK_LINES", 7):
+                with open("WebFileListing.json", "w") as f:
+                    write_react_chonky_json_listing(f, tree, "test")
+            with open("WebFileListing.json") as f:
+                self.assertEqual(f.read(), json.dumps(build_react_chonky_json_listing(tree, "test")))
+
+            # Each directory's children are listed once, and refer back to it
+            export = build_react_chonky_json_listing(tree, "test")
+            self.assertEqual(list(export), [str(i) for i in range(len(export))])
+            for key, value in export.items():
+                for child_id in value.get("childrenIds", []):
+                    self.assertEqual(export[child_id]["parentId"], key)
+
+    def test_build_html_ui_with_listing(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            tree = build_directory_tree("test")
+            export = build_react_chonky_json_listing(tree, "test")
+            html = build_html_ui(tree, "test")
+            self.assertIn(json.dumps(export), html)
+            self.assertEqual(build_html_ui(tree, "test", export), html)
+            self.assertEqual(build_html_ui(tree, "test", json.dumps(export)), html)
+
+            with open("WebInterface.html", "w") as f:
+                write_html_ui(f, tree, "test")
+            with open("WebInterface.html") as f:
+                self.assertEqual(f.read(), html)
+
+            # Copied from a listing already written, in small blocks, without walking the tree
+            with open("WebFileListing.json", "w") as f:
+                write_react_chonky_json_listing(f, tree, "test")
+            with open("WebInterface.html", "w") as f, open("WebFileListing.json") as file_listing:
+                with patch("archiver.archiver.LISTING_READ_CHARS", 7):
+                    with patch("archiver.archiver.iter_react_chonky_json_listing") as iter_listing:
+                        write_html_ui(f, tree, "test", file_listing)
+            iter_listing.assert_not_called()
+            with open("WebInterface.html") as f:
+                self.assertEqual(f.read(), html)
+
+    def test_runner_builds_file_map_once(self) -> None:
+        with isolated_filesystem():
+            add_mock_files_many()
+            html_before_file_map, html_after_file_map = get_html_ui_template(build_directory_tree("test"))
+            for compression in (None, "gzip"):
+                with self.subTest(compression=compression):
+                    output_directory = f"test_archive_{compression}"
+                    os.mkdir(output_directory)
+                    args = ["--output-dir", output_directory, "--input-dir", "test"]
+                    if compression is not None:
+                        args += ["--compress-listings", compression]
+                    runner = ArchiveRunner()
+                    runner.parse_arguments(args)
+                    with patch(
+                        "archiver.archiver.iter_react_chonky_json_listing", wraps=iter_react_chonky_json_listing
+                    ) as iter_listing:
+                        runner.run()
+                    # The tree is walked once, for WebFileListing.json, and the web interface embeds what was written
+                    self.assertEqual(iter_listing.call_count, 1)
+                    suffix = ".gz" if compression == "gzip" else ""
+                    with open_listing_input(f"{output_directory}/WebFileListing.json{suffix}", compression) as f:
+                        file_listing_json = f.read()
+                    with open(f"{output_directory}/WebInterface.html") as f:
+                        self.assertEqual(f.read(), html_before_file_map + file_listing_json + html_after_file_map)